@@ -1,98 +1,202 @@
-import requests
-from bs4 import BeautifulSoup
-import spacy
-from spacy.matcher import Matcher
 import pandas as pd
 import os
+import json
+import argparse
 from datetime import datetime
-import time
-
-# Load spaCy English model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Please install spaCy English model: python -m spacy download en_core_web_sm")
-    exit()
+from html_content import extract_main_text
+from page_fetch import PageFetcher, PageCache, DEFAULT_CACHE_DIR, DEFAULT_WORKERS, DEFAULT_PER_HOST
+from page_sources import iter_pages
+
+# spaCy is imported and the model loaded on first use (see PhraseExtractor), so the CLI
+# starts without paying for the model load
+MODEL_NAME = "en_core_web_sm"
+# Components the patterns do not need: matching uses POS tags, sentences and noun_chunks
+# come from the parser
+EXCLUDED_COMPONENTS = ("ner", "lemmatizer")
+
+# Documents per nlp.pipe batch
+DEFAULT_BATCH_SIZE = 16
+# Pages per appended output chunk (and checkpoint) in streaming mode
+DEFAULT_CHUNK_PAGES = 200
+
+# Always point to the repo's root data folder, even when running from scripts/
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+DEFAULT_STREAM_DIR = os.path.join(DATA_DIR, "phrase_stream")
+
+# Output file names and columns
+OUTPUT_FILES = {
+    'adj_noun': "islamabad_adj_noun_phrases.csv",
+    'noun_phrases': "islamabad_noun_phrases.csv",
+    'sentences': "islamabad_sentences.csv",
+    'combined': "islamabad_extracted_phrases.csv",
+}
+OUTPUT_COLUMNS = {
+    'adj_noun': ["adj_noun_phrase", "sentence", "source"],
+    'noun_phrases': ["noun_phrase", "sentence", "source"],
+    'sentences': ["sentence", "source"],
+    'combined': ['description', 'sentence_context', 'phrase_type', 'language', 'location',
+                 'osm_tag_key', 'osm_tag_value', 'source', 'coordinates', 'extracted_at'],
+}
+CHECKPOINT_FILE = "checkpoint.ndjson"
+
+# Pattern 1: Adjective(s) + Noun(s) (e.g., 'beautiful mosque', 'lush green hills')
+ADJ_NOUN_PATTERN = [
+    {"POS": "ADJ", "OP": "+"},
+    {"POS": "NOUN", "OP": "+"}
+]
+
+# Pattern 2: Determiner + Adjective(s) + Noun(s) (e.g., 'the beautiful mosque')
+DET_ADJ_NOUN_PATTERN = [
+    {"POS": "DET", "OP": "?"},
+    {"POS": "ADJ", "OP": "+"},
+    {"POS": "NOUN", "OP": "+"}
+]
+
+
+def html_to_text(html, encoding=None):
+    """Clean main text from the HTML (text, or bytes with their encoding) of a travel blog page."""
+    return extract_main_text(html, encoding)
+
+
+def page_text(page):
+    """Main text of a fetched Page, or "" for a failed fetch"""
+    if page is None:
+        return ""
+    text = html_to_text(page.content, page.encoding)
+    origin = "cache" if page.from_cache else "web"
+    print(f"✓ Successfully extracted {len(text)} characters from {page.url} ({origin})")
+    return text
 
 
-def get_text_from_url(url):
+def get_text_from_url(url, fetcher=None):
     """Fetch and clean main text from a travel blog URL."""
+    fetcher = fetcher or PageFetcher(PageCache())
     try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Remove unwanted elements
-        for tag in soup(["script", "style", "header", "footer", "nav", "aside", "form", "button"]):
-            tag.decompose()
-
-        # Extract text from paragraphs, headings, and list items
-        text_elements = soup.find_all(["p", "h1", "h2", "h3", "h4", "h5", "h6", "li"])
-        text = ' '.join([elem.get_text(separator=" ", strip=True) for elem in text_elements])
-
-        # Clean up extra whitespace
-        text = ' '.join(text.split())
-
-        print(f"✓ Successfully extracted {len(text)} characters from {url}")
-        return text
-
+        return page_text(fetcher.fetch(url))
     except Exception as e:
         print(f"✗ Error fetching {url}: {str(e)}")
         return ""
 
 
-def extract_adj_noun_phrases(text):
-    """Extract adjective–noun and noun phrases from text using spaCy."""
-    if not text.strip():
-        return [], []
-
-    doc = nlp(text)
-    matcher = Matcher(nlp.vocab)
-
-    # Pattern 1: Adjective(s) + Noun(s) (e.g., 'beautiful mosque', 'lush green hills')
-    adj_noun_pattern = [
-        {"POS": "ADJ", "OP": "+"},
-        {"POS": "NOUN", "OP": "+"}
-    ]
-
-    # Pattern 2: Determiner + Adjective(s) + Noun(s) (e.g., 'the beautiful mosque')
-    det_adj_noun_pattern = [
-        {"POS": "DET", "OP": "?"},
-        {"POS": "ADJ", "OP": "+"},
-        {"POS": "NOUN", "OP": "+"}
-    ]
-
-    matcher.add("ADJ_NOUN", [adj_noun_pattern])
-    matcher.add("DET_ADJ_NOUN", [det_adj_noun_pattern])
-
-    adj_noun_phrases = []
-    noun_phrases = []
-    sentences = []
+def within_sentence(span):
+    """True if a span starts and ends in the same sentence"""
+    doc = span.doc
+    return doc[span.start].sent.start == doc[span.end - 1].sent.start
+
+
+class PhraseExtractor:
+    """
+    Adjective-noun and noun phrase extraction with spaCy
+    The pipeline (without EXCLUDED_COMPONENTS) is loaded and the Matcher patterns compiled
+    once, on first use; every document after that only pays for parsing and matching
+    """
+
+    def __init__(self, model=MODEL_NAME, exclude=EXCLUDED_COMPONENTS):
+        self.model = model
+        self.exclude = list(exclude)
+        self._nlp = None
+        self._matcher = None
+
+    def load(self):
+        if self._nlp is None:
+            try:
+                import spacy
+                from spacy.matcher import Matcher
+            except ImportError:
+                raise ImportError("Phrase extraction needs spaCy: pip install spacy")
+            try:
+                nlp = spacy.load(self.model, exclude=self.exclude)
+            except OSError:
+                raise OSError(f"Please install spaCy English model: python -m spacy download {self.model}")
+
+            matcher = Matcher(nlp.vocab)
+            matcher.add("ADJ_NOUN", [ADJ_NOUN_PATTERN])
+            matcher.add("DET_ADJ_NOUN", [DET_ADJ_NOUN_PATTERN])
+            self._nlp, self._matcher = nlp, matcher
+        return self._nlp
+
+    @property
+    def nlp(self):
+        return self.load()
+
+    @property
+    def matcher(self):
+        self.load()
+        return self._matcher
+
+    def extract_doc(self, doc):
+        """
+        Extract adjective-noun phrases, noun phrases and sentences from a parsed doc
+        The matcher and noun_chunks run once over the doc; each phrase is assigned to its
+        sentence span, so no sentence is parsed a second time; phrases that run across a
+        sentence boundary are skipped
+        """
+        sentences = []
+        sentence_texts = {}  # sentence start token -> text, for the sentences kept
+        for sent in doc.sents:
+            sent_text = sent.text.strip()
+            if len(sent_text) > 10:  # Filter out very short sentences
+                sentences.append(sent_text)
+                sentence_texts[sent.start] = sent_text
+
+        # Extract adj-noun patterns
+        adj_noun_phrases = []
+        for match_id, start, end in self.matcher(doc):
+            span = doc[start:end]
+            if not within_sentence(span):
+                continue
+            sent_text = sentence_texts.get(span.sent.start)
+            phrase = span.text.strip()
+            if sent_text and len(phrase) > 3 and phrase.lower() not in ['the', 'a', 'an']:
+                adj_noun_phrases.append((phrase, sent_text))
+
+        # Extract noun chunks (noun phrases)
+        noun_phrases = []
+        for chunk in doc.noun_chunks:
+            if not within_sentence(chunk):
+                continue
+            sent_text = sentence_texts.get(chunk.sent.start)
+            phrase = chunk.text.strip()
+            if sent_text and len(phrase) > 2 and phrase.lower() not in ['the', 'a', 'an', 'this', 'that']:
+                noun_phrases.append((phrase, sent_text))
+
+        return adj_noun_phrases, noun_phrases, sentences
+
+    def extract(self, text):
+        """Extract adjective–noun and noun phrases from text using spaCy."""
+        if not text.strip():
+            return [], [], []
+        return self.extract_doc(self.nlp(text))
+
+    def extract_corpus(self, texts, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+        """
+        Extract phrases from many texts, parsed in batches with nlp.pipe (across n_process
+        worker processes); yields (adj_noun, noun_phrases, sentences) per text, in order
+        """
+        for doc in self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+            yield self.extract_doc(doc)
+
+    def extract_stream(self, items, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+        """
+        Like extract_corpus for an iterable of (text, context) pairs, consumed lazily;
+        yields (context, (adj_noun, noun_phrases, sentences)) per text, in order
+        """
+        for doc, context in self.nlp.pipe(items, as_tuples=True, batch_size=batch_size, n_process=n_process):
+            yield context, self.extract_doc(doc)
+
+
+# Shared extractor; nothing is loaded until the first extraction
+extractor = PhraseExtractor()
 
-    for sent in doc.sents:
-        sent_text = sent.text.strip()
-        if len(sent_text) > 10:  # Filter out very short sentences
-            sentences.append(sent_text)
 
-            # Extract adj-noun patterns
-            sent_doc = nlp(sent_text)
-            matches = matcher(sent_doc)
-
-            for match_id, start, end in matches:
-                span = sent_doc[start:end]
-                phrase = span.text.strip()
-                if len(phrase) > 3 and phrase.lower() not in ['the', 'a', 'an']:
-                    adj_noun_phrases.append((phrase, sent_text))
+def extract_adj_noun_phrases(text):
+    """Extract adjective–noun and noun phrases from text using spaCy."""
+    return extractor.extract(text)
 
-            # Extract noun chunks (noun phrases)
-            for chunk in sent_doc.noun_chunks:
-                phrase = chunk.text.strip()
-                if len(phrase) > 2 and phrase.lower() not in ['the', 'a', 'an', 'this', 'that']:
-                    noun_phrases.append((phrase, sent_text))
 
-    return adj_noun_phrases, noun_phrases, sentences
+def extract_corpus(texts, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+    """Extract phrases from many texts with the shared extractor (see PhraseExtractor.extract_corpus)"""
+    return extractor.extract_corpus(texts, batch_size, n_process)
 
 
 def process_blog(url):
@@ -112,8 +216,141 @@ def process_blog(url):
     return adj_noun, noun_phrases, sentences
 
 
+def combined_rows(adj_noun, noun_phrases, location='Islamabad'):
+    """Rows of the combined dataset (thesis structure) for (phrase, sentence, source) tuples"""
+    extracted_at = datetime.now().isoformat()
+    rows = []
+    for phrase_type, phrases in (('adjective_noun', adj_noun), ('noun_phrase', noun_phrases)):
+        for phrase, sentence, source in phrases:
+            rows.append({
+                'description': phrase,
+                'sentence_context': sentence,
+                'phrase_type': phrase_type,
+                'language': 'English',
+                'location': location,
+                'osm_tag_key': '',  # To be filled later
+                'osm_tag_value': '',  # To be filled later
+                'source': source,
+                'coordinates': '',  # To be filled later
+                'extracted_at': extracted_at
+            })
+    return rows
+
+
+class StreamCheckpoint:
+    """
+    Progress of a streaming extraction: one NDJSON line per flushed chunk with the pages it
+    covered and the size of every output file after it was appended. On resume the outputs
+    are cut back to the last recorded sizes, so a crash mid-chunk leaves no partial rows
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self.output_paths = {name: os.path.join(output_dir, file_name) for name, file_name in OUTPUT_FILES.items()}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def resume(self):
+        """Set of page ids already extracted; truncates the outputs to the last checkpoint"""
+        done, sizes = set(), {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn last line
+                    done.update(entry['pages'])
+                    sizes = entry['sizes']
+        for name, path in self.output_paths.items():
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(sizes.get(name, 0))
+        return done
+
+    def append(self, frames, pages):
+        """Append one chunk of output frames, then record it"""
+        for name, df in frames.items():
+            path = self.output_paths[name]
+            df.to_csv(path, mode='a', index=False, header=not os.path.exists(path) or os.path.getsize(path) == 0)
+        entry = {'pages': pages, 'sizes': {name: os.path.getsize(path) for name, path in self.output_paths.items()
+                                           if os.path.exists(path)}}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def stream_extract(source, output_dir=DEFAULT_STREAM_DIR, location='Islamabad', batch_size=DEFAULT_BATCH_SIZE,
+                   n_process=1, chunk_pages=DEFAULT_CHUNK_PAGES):
+    """
+    Extract phrases from every page of a local directory or WARC archive with bounded memory
+    Pages flow through a generator pipeline (read -> clean -> nlp.pipe); results are appended
+    to the outputs in chunks of chunk_pages pages and checkpointed, and a rerun skips the
+    pages already done. Returns the number of pages extracted in this run
+    """
+    checkpoint = StreamCheckpoint(output_dir)
+    done = checkpoint.resume()
+    if done:
+        print(f"🔄 Resuming: {len(done)} pages already extracted")
+    max_length = extractor.nlp.max_length
+
+    def texts():
+        for page in iter_pages(source):
+            if page.url not in done:
+                yield html_to_text(page.content, page.encoding)[:max_length], page.url
+
+    extracted = 0
+    chunk = {name: [] for name in OUTPUT_FILES}
+    pages = []
+
+    def flush():
+        frames = {name: pd.DataFrame(rows, columns=OUTPUT_COLUMNS[name]) for name, rows in chunk.items()}
+        checkpoint.append(frames, pages)
+        for rows in chunk.values():
+            rows.clear()
+        pages.clear()
+
+    for url, (adj_noun, noun_phrases, sentences) in extractor.extract_stream(texts(), batch_size, n_process):
+        adj_noun = [(phrase, sentence, url) for phrase, sentence in adj_noun]
+        noun_phrases = [(phrase, sentence, url) for phrase, sentence in noun_phrases]
+        chunk['adj_noun'].extend(adj_noun)
+        chunk['noun_phrases'].extend(noun_phrases)
+        chunk['sentences'].extend((sentence, url) for sentence in sentences)
+        chunk['combined'].extend(combined_rows(adj_noun, noun_phrases, location))
+        pages.append(url)
+        extracted += 1
+        if len(pages) >= chunk_pages:
+            flush()
+            print(f"💾 {len(done) + extracted} pages extracted")
+    if pages:
+        flush()
+    return extracted
+
+
 def main():
     """Main function to process all blogs and save results."""
+    parser = argparse.ArgumentParser(description="Extract adjective-noun and noun phrases from Islamabad travel blogs")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes for spaCy parsing")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Documents per nlp.pipe batch")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent page downloads")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST, help="Concurrent downloads per host")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory of the page cache")
+    parser.add_argument("--offline", action="store_true", help="Replay pages from the cache without network access")
+    parser.add_argument("--input", help="Stream pages from a local directory of HTML files or a WARC archive "
+                                        "instead of fetching the blog URLs")
+    parser.add_argument("--output-dir", default=DEFAULT_STREAM_DIR, help="Output directory of the streaming mode")
+    parser.add_argument("--location", default="Islamabad", help="Location of the streamed pages")
+    parser.add_argument("--chunk-pages", type=int, default=DEFAULT_CHUNK_PAGES,
+                        help="Pages per appended chunk and checkpoint in streaming mode")
+    args = parser.parse_args()
+
+    if args.input:
+        print(f"🚀 Streaming phrase extraction from {args.input}")
+        extracted = stream_extract(args.input, args.output_dir, args.location, args.batch_size,
+                                   args.processes, args.chunk_pages)
+        print(f"🎉 Extracted {extracted} pages into {args.output_dir}")
+        return
+
     print("🚀 Starting Islamabad Travel Blog Phrase Extraction")
     print("=" * 60)
 
@@ -128,79 +365,51 @@ def main():
     all_adj_noun = []
     all_noun_phrases = []
     all_sentences = []
-    all_sources = []
 
-    # Process each URL
-    for i, url in enumerate(urls, 1):
-        print(f"\n[{i}/{len(urls)}] Processing blog...")
-        adj_noun, noun_phrases, sentences = process_blog(url)
+    # Fetch all URLs concurrently; requests to the same host stay spaced out
+    print(f"\n🌐 Fetching {len(urls)} blogs ({args.workers} workers)...")
+    fetcher = PageFetcher(PageCache(args.cache_dir), workers=args.workers, per_host=args.per_host, offline=args.offline)
+    try:
+        texts = [page_text(page) for url, page in fetcher.fetch_all(urls)]
+    finally:
+        fetcher.close()
+
+    # Parse all pages in batches
+    print(f"\n🔄 Extracting phrases from {len(texts)} pages ({args.processes} process(es))...")
+    for url, (adj_noun, noun_phrases, sentences) in zip(urls, extract_corpus(texts, args.batch_size, args.processes)):
+        print(f"   {url}: {len(sentences)} sentences, {len(adj_noun)} adjective-noun phrases, "
+              f"{len(noun_phrases)} noun phrases")
 
         # Add to collections with source info
         all_adj_noun.extend([(phrase, sentence, url) for phrase, sentence in adj_noun])
         all_noun_phrases.extend([(phrase, sentence, url) for phrase, sentence in noun_phrases])
         all_sentences.extend([(sentence, url) for sentence in sentences])
 
-        # Small delay to be respectful to servers
-        time.sleep(1)
-
     print(f"\n📊 EXTRACTION SUMMARY:")
     print(f"   Total sentences: {len(all_sentences)}")
     print(f"   Total adjective-noun phrases: {len(all_adj_noun)}")
     print(f"   Total noun phrases: {len(all_noun_phrases)}")
 
-    # Always point to the repo's root data folder, even when running from scripts/
-    data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+    data_dir = DATA_DIR
     print(f"\n📁 Saving files to '{data_dir}' directory...")
 
     # Create DataFrames
-    df_adj_noun = pd.DataFrame(all_adj_noun, columns=["adj_noun_phrase", "sentence", "source"])
-    df_noun_phrases = pd.DataFrame(all_noun_phrases, columns=["noun_phrase", "sentence", "source"])
-    df_sentences = pd.DataFrame(all_sentences, columns=["sentence", "source"])
+    df_adj_noun = pd.DataFrame(all_adj_noun, columns=OUTPUT_COLUMNS['adj_noun'])
+    df_noun_phrases = pd.DataFrame(all_noun_phrases, columns=OUTPUT_COLUMNS['noun_phrases'])
+    df_sentences = pd.DataFrame(all_sentences, columns=OUTPUT_COLUMNS['sentences'])
 
     # Save individual files
-    adj_noun_file = os.path.join(data_dir, "islamabad_adj_noun_phrases.csv")
-    noun_phrases_file = os.path.join(data_dir, "islamabad_noun_phrases.csv")
-    sentences_file = os.path.join(data_dir, "islamabad_sentences.csv")
+    adj_noun_file = os.path.join(data_dir, OUTPUT_FILES['adj_noun'])
+    noun_phrases_file = os.path.join(data_dir, OUTPUT_FILES['noun_phrases'])
+    sentences_file = os.path.join(data_dir, OUTPUT_FILES['sentences'])
 
     df_adj_noun.to_csv(adj_noun_file, index=False)
     df_noun_phrases.to_csv(noun_phrases_file, index=False)
     df_sentences.to_csv(sentences_file, index=False)
 
     # Create combined dataset matching your thesis structure
-    combined_data = []
-
-    # Add adjective-noun phrases
-    for phrase, sentence, source in all_adj_noun:
-        combined_data.append({
-            'description': phrase,
-            'sentence_context': sentence,
-            'phrase_type': 'adjective_noun',
-            'language': 'English',
-            'location': 'Islamabad',
-            'osm_tag_key': '',  # To be filled later
-            'osm_tag_value': '',  # To be filled later
-            'source': source,
-            'coordinates': '',  # To be filled later
-            'extracted_at': datetime.now().isoformat()
-        })
-
-    # Add noun phrases
-    for phrase, sentence, source in all_noun_phrases:
-        combined_data.append({
-            'description': phrase,
-            'sentence_context': sentence,
-            'phrase_type': 'noun_phrase',
-            'language': 'English',
-            'location': 'Islamabad',
-            'osm_tag_key': '',  # To be filled later
-            'osm_tag_value': '',  # To be filled later
-            'source': source,
-            'coordinates': '',  # To be filled later
-            'extracted_at': datetime.now().isoformat()
-        })
-
-    df_combined = pd.DataFrame(combined_data)
-    combined_file = os.path.join(data_dir, "islamabad_extracted_phrases.csv")
+    df_combined = pd.DataFrame(combined_rows(all_adj_noun, all_noun_phrases), columns=OUTPUT_COLUMNS['combined'])
+    combined_file = os.path.join(data_dir, OUTPUT_FILES['combined'])
     df_combined.to_csv(combined_file, index=False)
 
     print(f"✅ Files saved successfully:")
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from osm_legacy import legacy_files, load_legacy_csv
+from osm_vocab import TagVocabulary
 
 # Read the CSV files
 adj_noun_df = pd.read_csv('../data/islamabad_adj_noun_phrases.csv')
@@ -40,4 +42,20 @@ if 'phrase' in noun_df.columns:
 elif 'noun' in noun_df.columns:
     print(f"\nUnique nouns: {noun_df['noun'].nunique()}")
     print("Top 10 most frequent nouns:")
-    print(noun_df['noun'].value_counts().head(10))
\ No newline at end of file
+    print(noun_df['noun'].value_counts().head(10))
+
+# OSM tag transactions for FP-Growth: one transaction per element, whose items are the tag
+# pair ids of the shared vocabulary (the same ids as the tag_ids column of the Parquet dataset)
+print("\n=== OSM Tag Transactions ===")
+osm_df = pd.concat([load_legacy_csv(path) for path in legacy_files('../data').values()], ignore_index=True)
+vocabulary = TagVocabulary()
+indptr, indices = vocabulary.tag_matrix(osm_df['all_tags'])
+print(f"Transactions: {len(indptr) - 1}, items: {len(indices)}, distinct tag pairs: {len(np.unique(indices))}")
+
+# Support of every single tag pair, the first pass of FP-Growth
+pair_ids, support = np.unique(indices, return_counts=True)
+top = np.argsort(support)[::-1][:10]
+print("Top 10 most frequent tag pairs:")
+for (key, value), count in zip(vocabulary.decode_pairs(pair_ids[top]), support[top]):
+    print(f"   {key}={value}: {count}")
+vocabulary.close()
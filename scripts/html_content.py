@@ -0,0 +1,170 @@
+# Main-content text extraction from HTML pages
+# Parses with lxml (libxml2, in C), strips non-content elements in one pass, drops site chrome
+# (menus, share bars, language switchers) by class/id and link density, and keeps the text
+# blocks under the common ancestor of the densest content containers, so the NLP stage sees
+# the article and little else. Pages where that selection fails fall back to their full text.
+import re
+import lxml.html
+from lxml import etree
+
+# Removed with their content before anything else is looked at
+DROP_TAGS = ('script', 'style', 'noscript', 'template', 'svg', 'iframe', 'header', 'footer',
+             'nav', 'aside', 'form', 'button', 'select')
+# Blocks whose text is extracted: paragraphs, headings and list items
+TEXT_TAGS = ('p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li')
+HEADINGS = frozenset(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+
+# class/id fragments of boilerplate containers
+_BOILERPLATE = re.compile(
+    r'(^|[\s_-])(nav|navbar|menu|breadcrumbs?|share|sharing|social|related|comments?|sidebar|widget|'
+    r'footer|masthead|banner|cookie|newsletter|subscribe|advert|popup|modal|lang|language|switcher|'
+    r'pagination)([\s_-]|$)', re.IGNORECASE)
+# Candidates for class/id based removal; never a container of the article itself, and only
+# dropped when they hold no content block (see is_content_block)
+_BOILERPLATE_XPATH = etree.XPath(
+    "//*[@class or @id][not(self::html or self::body or self::article or self::main)][not(.//article or .//main)]")
+
+# Blocks with more than this share of their text inside links are navigation
+MAX_LINK_DENSITY = 0.5
+# Content blocks shorter than this (in characters) do not count towards a container's score
+MIN_BLOCK_CHARS = 25
+# A block this long with little linked text is article content, whatever its container is called
+CONTENT_BLOCK_CHARS = 80
+CONTENT_LINK_DENSITY = 0.3
+# Containers scoring at least this share of the best one are part of the content
+CONTAINER_SCORE_SHARE = 0.2
+# A selection shorter than this share of the page text is not trusted; the full text is used
+MIN_SELECTION_SHARE = 0.25
+
+
+def parse_html(content, encoding=None):
+    """Parse page bytes (or text) into an lxml document, or None for an empty page"""
+    if isinstance(content, str):
+        content, encoding = content.encode('utf-8'), 'utf-8'
+    parser = lxml.html.HTMLParser(encoding=encoding, remove_comments=True, remove_pis=True)
+    try:
+        return lxml.html.document_fromstring(content, parser=parser)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def normalize_space(text):
+    return ' '.join(text.split())
+
+
+def link_density(element, text_length):
+    if not text_length:
+        return 0.0
+    link_chars = sum(len(normalize_space(a.text_content())) for a in element.iter('a'))
+    return link_chars / text_length
+
+
+def is_content_block(element):
+    """True for a long text block with little linked text"""
+    text = normalize_space(element.text_content())
+    return len(text) >= CONTENT_BLOCK_CHARS and link_density(element, len(text)) < CONTENT_LINK_DENSITY
+
+
+def strip_boilerplate(tree):
+    """
+    Drop non-content elements, and containers whose class or id marks them as site chrome
+    unless they hold a content block (wrappers classed e.g. 'has-sidebar' or 'lang-en')
+    """
+    etree.strip_elements(tree, *DROP_TAGS, with_tail=False)
+    for element in _BOILERPLATE_XPATH(tree):
+        marker = f"{element.get('class', '')} {element.get('id', '')}"
+        if not _BOILERPLATE.search(marker) or element.getparent() is None:
+            continue
+        if not any(is_content_block(block) for block in element.iter(*TEXT_TAGS)):
+            element.drop_tree()
+
+
+def text_blocks(root):
+    """
+    (element, text) of the outermost text blocks under root, skipping navigation-like
+    blocks; a <p> inside an <li> is not repeated
+    """
+    blocks = []
+    taken = set()
+    for element in root.iter(*TEXT_TAGS):
+        if any(ancestor in taken for ancestor in element.iterancestors(*TEXT_TAGS)):
+            continue
+        text = normalize_space(element.text_content())
+        if not text or link_density(element, len(text)) > MAX_LINK_DENSITY:
+            continue
+        taken.add(element)
+        blocks.append((element, text))
+    return blocks
+
+
+def container_scores(blocks):
+    """
+    Content score of the elements holding text blocks: every block adds its length (less
+    its linked text) to its parent and half of that to its grandparent
+    """
+    scores = {}
+    for element, text in blocks:
+        if element.tag in HEADINGS or len(text) < MIN_BLOCK_CHARS:
+            continue
+        score = len(text) * (1.0 - link_density(element, len(text)))
+        parent = element.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0.0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0.0) + score / 2
+    return scores
+
+
+def common_ancestor(elements):
+    """Lowest element that is (or contains) every one of elements"""
+    elements = iter(elements)
+    first = next(elements)
+    lineage = [first] + list(first.iterancestors())
+    for element in elements:
+        ancestors = {element, *element.iterancestors()}
+        lineage = lineage[next(i for i, candidate in enumerate(lineage) if candidate in ancestors):]
+    return lineage[0]
+
+
+def main_container(blocks, root):
+    """
+    The element holding the article: the lowest common ancestor of every container
+    scoring at least CONTAINER_SCORE_SHARE of the best one, so an article split into
+    sibling sections is kept whole
+    """
+    scores = container_scores(blocks)
+    if not scores:
+        return root
+    best = max(scores.values())
+    return common_ancestor(element for element, score in scores.items() if score >= CONTAINER_SCORE_SHARE * best)
+
+
+def extract_main_text(content, encoding=None):
+    """
+    Main text of an HTML page (bytes with their encoding, or text) as one whitespace-normalized
+    string; the page's full text when no content blocks are found or they cover too little of it
+    """
+    tree = parse_html(content, encoding)
+    if tree is None:
+        return ''
+    strip_boilerplate(tree)
+    blocks = text_blocks(tree)
+    container = main_container(blocks, tree)
+
+    # Keep the blocks inside the content container; its heading may sit just above it
+    content_parent = container.getparent()
+    kept = []
+    for element, text in blocks:
+        if element is container or container in element.iterancestors() or (
+                element.tag in HEADINGS and content_parent is not None and content_parent in element.iterancestors()):
+            kept.append(text)
+    selection = ' '.join(kept)
+
+    # Text outside p/h*/li (e.g. in bare divs or spans) is not a block; such pages keep their full text
+    body = tree.find('body')
+    full_text = normalize_space(' '.join((body if body is not None else tree).itertext()))
+    if len(selection) < MIN_SELECTION_SHARE * len(full_text):
+        return full_text
+    return selection
@@ -0,0 +1,762 @@
+# Unified OSM Data Collection Engine
+# Collects every city listed in data/5_main_cities_pk.csv (see maincitiesdatatable.py)
+# with one shared code path, running several cities at once on a bounded worker pool.
+import os
+import sys
+import argparse
+import overpy
+import pandas as pd
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import time
+from overpass_cache import ResponseCache, CachedOverpass, DEFAULT_CACHE_DIR, DEFAULT_TTL_HOURS, DEFAULT_MAX_MB
+from overpass_stream import StreamingOverpass
+from osm_incremental import SyncState, upsert_records, load_raw_records, utc_now, DEFAULT_STATE_FILE
+from overpass_scheduler import RequestScheduler, ScheduledOverpass, DEFAULT_MAX_RETRIES
+from osm_records import OSMRecord, records_frame, CATEGORY_SEPARATOR
+from osm_language import detect_languages
+from osm_geometry import compact_parts
+from osm_raw_archive import DecimalEncoder, RawArchiveWriter, write_raw_archive, raw_archive_path
+from osm_columnar import write_city_dataset, DEFAULT_DATASET_DIR
+from osm_store import PlaceStore, DEFAULT_STORE_FILE
+from osm_vocab import TagVocabulary, DEFAULT_VOCAB_FILE
+from osm_tiling import fetch_tiles, iter_result_elements, DEFAULT_TILE_WORKERS
+
+# Always point to the repo's root data folder, even when running from scripts/
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+CITY_TABLE = os.path.join(DATA_DIR, "5_main_cities_pk.csv")
+
+# Tag filters for each collection category as (key, value) pairs; a value of None matches any value
+CATEGORY_FILTERS = {
+    'amenities': [('amenity', None)],
+    'tourism': [('tourism', None)],
+    'leisure': [('leisure', None)],
+    'shop': [('shop', None)],
+    'historic': [('historic', None)],
+    'bazaar': [('shop', 'bazaar'), ('amenity', 'marketplace')],
+    'place_of_worship': [('amenity', 'place_of_worship')],
+    'port': [('harbour', None), ('port', None)],
+    'hotel': [('tourism', 'hotel'), ('tourism', 'guest_house')],
+    'natural': [('natural', None)],
+}
+
+# Generic tags used as a last resort when picking the primary OSM tag
+FALLBACK_PRIORITY_TAGS = ['building', 'landuse']
+
+# Output statements for each geometry mode:
+# 'recurse' downloads every member node ('out body; >; out skel qt;'),
+# 'center' asks the server for way/relation centroids,
+# 'geom' asks for compact inline geometries and computes centroids locally
+# {verbosity} is 'body', or 'meta' when element versions are needed
+GEOMETRY_OUTPUTS = {
+    'recurse': ["out {verbosity};", ">;", "out skel qt;"],
+    'center': ["out {verbosity} center qt;"],
+    'geom': ["out {verbosity} geom qt;"],
+}
+
+DEFAULT_MAX_WORKERS = 3
+
+# Output formats written by save_city_data: 'ndjson' is the compressed line-per-record raw archive,
+# 'json' the legacy pretty-printed raw dump, 'parquet' the typed partitioned dataset,
+# 'sqlite' the indexed place store
+OUTPUT_FORMATS = ('csv', 'ndjson', 'json', 'parquet', 'sqlite')
+DEFAULT_FORMATS = ('csv', 'ndjson')
+
+
+def load_cities(path=CITY_TABLE, names=None):
+    """
+    Load the city table and return one config dict per city
+    Optionally keep only the cities listed in names (case-insensitive)
+    """
+    df = pd.read_csv(path, encoding='utf-8')
+
+    wanted = {name.lower() for name in names} if names else None
+    cities = []
+    for _, row in df.iterrows():
+        name = row['City'].strip()
+        if wanted and name.lower() not in wanted:
+            continue
+
+        south, west, north, east = (float(v) for v in row['Coordinates (South, West, North, East)'].split(','))
+        categories = [c.strip() for c in row['Categories'].split(',') if c.strip()]
+
+        unknown = [c for c in categories if c not in CATEGORY_FILTERS]
+        if unknown:
+            raise ValueError(f"Unknown categories for {name}: {unknown}")
+
+        cities.append({
+            'name': name,
+            'slug': name.lower().replace(' ', '_'),
+            'bbox': (south, west, north, east),
+            'categories': categories,
+        })
+
+    if wanted:
+        missing = wanted - {c['name'].lower() for c in cities}
+        if missing:
+            raise ValueError(f"Cities not found in {path}: {sorted(missing)}")
+
+    return cities
+
+
+def get_city(name, path=CITY_TABLE):
+    """Return the config dict of a single city from the city table"""
+    return load_cities(path, names=[name])[0]
+
+
+def priority_tags_for(categories):
+    """
+    Primary tag priority for a city: the keys of its categories in table order,
+    followed by the generic building/landuse tags
+    """
+    priority_tags = []
+    for category in categories:
+        for key, _ in CATEGORY_FILTERS[category]:
+            if key not in priority_tags:
+                priority_tags.append(key)
+    for key in FALLBACK_PRIORITY_TAGS:
+        if key not in priority_tags:
+            priority_tags.append(key)
+    return priority_tags
+
+
+def format_bbox(bbox):
+    """Format a (south, west, north, east) tuple as an Overpass bbox filter"""
+    return ",".join(f"{v:.4f}" for v in bbox)
+
+
+def tag_filter(key, value):
+    """Overpass tag filter for a (key, value) pair"""
+    return f'["{key}"="{value}"]' if value else f'["{key}"]'
+
+
+def build_query(bbox, filters, timeout=60, geometry='recurse', newer=None, meta=False):
+    """
+    Build an Overpass QL union query for a list of (key, value) tag filters inside a bounding box
+    newer restricts the query to elements changed since an ISO timestamp; meta adds element versions
+    """
+    if geometry not in GEOMETRY_OUTPUTS:
+        raise ValueError(f"Unknown geometry mode: {geometry}")
+
+    bbox_filter = format_bbox(bbox)
+    newer_filter = f'(newer:"{newer}")' if newer else ''
+
+    selectors = []
+    for key, value in filters:
+        for element_type in ('node', 'way', 'relation'):
+            selectors.append(f"  {element_type}{tag_filter(key, value)}{newer_filter}({bbox_filter});")
+
+    return "\n".join([
+        f"[out:json][timeout:{timeout}];",
+        "(",
+        *selectors,
+        ");",
+        *(statement.format(verbosity='meta' if meta else 'body') for statement in GEOMETRY_OUTPUTS[geometry]),
+    ])
+
+
+def build_category_query(bbox, category, timeout=60, geometry='recurse', newer=None, meta=False):
+    """Build the Overpass QL query for one category inside a bounding box"""
+    return build_query(bbox, CATEGORY_FILTERS[category], timeout, geometry, newer, meta)
+
+
+def merged_filters(categories):
+    """
+    Union of the tag filters of several categories without redundant selectors:
+    a key=value filter is dropped when the same key is already matched for any value
+    """
+    filters = []
+    for category in categories:
+        for key, value in CATEGORY_FILTERS[category]:
+            if (key, value) not in filters:
+                filters.append((key, value))
+
+    any_value_keys = {key for key, value in filters if value is None}
+    return [(key, value) for key, value in filters if value is None or key not in any_value_keys]
+
+
+def build_merged_query(bbox, categories, timeout=60, geometry='recurse', newer=None, meta=False):
+    """Build a single Overpass QL query covering all given categories inside a bounding box"""
+    return build_query(bbox, merged_filters(categories), timeout, geometry, newer, meta)
+
+
+def assign_categories(tags, categories):
+    """Return the categories (in the given order) whose tag filters match an element's tags"""
+    matched = []
+    for category in categories:
+        for key, value in CATEGORY_FILTERS[category]:
+            if key in tags and (value is None or tags[key] == value):
+                matched.append(category)
+                break
+    return matched
+
+
+def query_plan(categories, query_mode='category'):
+    """
+    Split a city's categories into (label, categories) query groups:
+    one group per category, or a single merged group
+    """
+    if query_mode == 'merged':
+        return [('merged', list(categories))]
+    if query_mode == 'category':
+        return [(category, [category]) for category in categories]
+    raise ValueError(f"Unknown query mode: {query_mode}")
+
+
+def make_api(cache=None, streaming=False, scheduler=None, label=''):
+    """
+    Overpass API client whose network queries are paced and retried by a RequestScheduler,
+    answering from the response cache when one is given.
+    streaming=True returns a client that parses responses incrementally (center/geom geometry only)
+    """
+    if streaming:
+        api = StreamingOverpass(cache)
+    else:
+        api = CachedOverpass(cache) if cache else overpy.Overpass()
+    return ScheduledOverpass(api, scheduler or RequestScheduler(api.url), label)
+
+
+def collect_city(city, api=None, query_mode='category', geometry='recurse',
+                 tile_size=None, tile_workers=DEFAULT_TILE_WORKERS, scheduler=None, cache=None,
+                 streaming=False, since=None, sync_times=None, labels=None, errors=None, archive=None,
+                 keep_records=True):
+    """
+    Collect OSM data for one city with place descriptions and tags
+    Focus on places that have names, descriptions, or other text attributes
+
+    query_mode='category' sends one query per category; query_mode='merged' sends a
+    single union query and assigns (possibly several) categories to each element locally.
+    geometry selects how way/relation coordinates are obtained (see GEOMETRY_OUTPUTS).
+    With tile_size (degrees) the bbox is fetched as parallel quadtree tiles.
+    scheduler is the RequestScheduler pacing and retrying requests, shared by all cities.
+    cache is an optional ResponseCache shared by all cities.
+    streaming=True parses responses element by element instead of building overpy Results.
+
+    For incremental runs, since maps query group labels to the ISO timestamp of their last
+    sync: those groups only fetch elements changed since then, with element versions.
+    The start time of every group that completed without errors is stored in sync_times
+
+    labels restricts the run to some query groups; the error message of every failed
+    group is stored in errors
+
+    archive is an optional RawArchiveWriter that every record is written to as soon as it
+    is processed; the records of a failed group are rolled back. Archived records carry no
+    language yet, which save_city_data labels whenever records are saved. With
+    keep_records=False the records are only archived and an empty list is returned,
+    so memory stays flat
+    """
+    if streaming and geometry == 'recurse':
+        raise ValueError("Streaming needs the 'center' or 'geom' geometry mode")
+
+    # One Overpass instance per city; its tile workers share it
+    api = api or make_api(cache, streaming, scheduler, city['name'])
+
+    name = city['name']
+    priority_tags = priority_tags_for(city['categories'])
+
+    all_data = []
+    # One timestamp string shared by every record of this run
+    collected_at = datetime.now().isoformat()
+
+    print(f"🚀 [{name}] Starting OSM data collection...")
+    print(f"📍 [{name}] Bounding box: {format_bbox(city['bbox'])}")
+
+    for label, categories in query_plan(city['categories'], query_mode):
+        if labels is not None and label not in labels:
+            continue
+        print(f"📊 [{name}] Collecting {label} data...")
+        category = categories if query_mode == 'merged' else label
+
+        newer = (since or {}).get(label)
+        if newer:
+            print(f"🔁 [{name}] Only fetching {label} elements changed since {newer}")
+
+        def build(bbox, categories=categories, label=label, newer=newer):
+            if query_mode == 'merged':
+                return build_merged_query(bbox, categories, geometry=geometry, newer=newer, meta=since is not None)
+            return build_category_query(bbox, label, geometry=geometry, newer=newer, meta=since is not None)
+
+        started_at = utc_now()
+        group_start = len(all_data)
+        group_count = 0
+        try:
+            if tile_size:
+                elements, failed_tiles = fetch_tiles(api, city['bbox'], build, tile_size,
+                                                     workers=tile_workers, label=f"{name}/{label}")
+                if failed_tiles:
+                    print(f"⚠️ [{name}] {len(failed_tiles)} {label} tiles could not be collected")
+                    started_at = None
+                    if errors is not None:
+                        errors[label] = f"{len(failed_tiles)} tiles could not be collected"
+            else:
+                elements = iter_result_elements(api.query(build(city['bbox'])))
+
+            # Entries are dropped again (and rolled back in the archive) unless the whole
+            # response was read without errors
+            for element_type, element in elements:
+                data_entry = process_osm_element(element, element_type, category, name, priority_tags, collected_at)
+                if data_entry:
+                    group_count += 1
+                    if keep_records:
+                        all_data.append(data_entry)
+                    if archive is not None:
+                        archive.write(data_entry)
+            if archive is not None:
+                archive.mark()
+
+            print(f"✅ [{name}] Collected {group_count} {label} entries")
+            if sync_times is not None and started_at is not None:
+                sync_times[label] = started_at
+
+        except Exception as e:
+            del all_data[group_start:]
+            if archive is not None:
+                archive.rollback()
+            print(f"❌ [{name}] Error collecting {label}: {str(e)}")
+            if errors is not None:
+                errors[label] = str(e)
+            continue
+
+    return all_data
+
+
+def process_osm_element(element, element_type, category, city_name, priority_tags=None, collected_at=None):
+    """
+    Process an OSM element (node, way, or relation) and extract relevant data as an OSMRecord
+    category is either a single category name, or a list of candidate categories
+    that are matched against the element's tags (merged query mode)
+    collected_at is the ISO timestamp of the collection run (default: now)
+    """
+    tags = element.tags
+
+    # Skip if no useful tags
+    if not tags:
+        return None
+
+    # Assign categories locally for merged queries
+    if not isinstance(category, str):
+        matched = assign_categories(tags, category)
+        if not matched:
+            return None
+        category = CATEGORY_SEPARATOR.join(matched)
+
+    # Extract name and description-like fields
+    name = tags.get('name', '')
+    name_en = tags.get('name:en', '')
+    name_ur = tags.get('name:ur', '')
+    description = tags.get('description', '')
+
+    # Create a combined description from available text fields
+    text_parts = []
+    if name: text_parts.append(name)
+    if name_en and name_en != name: text_parts.append(f"({name_en})")
+    if name_ur and name_ur != name: text_parts.append(f"[{name_ur}]")
+    if description: text_parts.append(description)
+
+    combined_description = " ".join(text_parts).strip()
+
+    # Skip if no meaningful text content
+    if not combined_description:
+        return None
+
+    # Determine primary OSM tag
+    primary_key = None
+    primary_value = None
+
+    # Priority order for main tags
+    if priority_tags is None:
+        priority_tags = priority_tags_for(list(CATEGORY_FILTERS))
+    for tag in priority_tags:
+        if tag in tags:
+            primary_key = tag
+            primary_value = tags[tag]
+            break
+
+    if not primary_key:
+        return None
+
+    # Extract the geometry and the coordinates derived from it
+    parts = element_parts(element, element_type)
+    lat, lon = element_coordinates(element, element_type, parts)
+
+    # The element's tag dict is referenced, not copied: elements are discarded after processing
+    return OSMRecord(
+        osm_id=element.id,
+        element_type=element_type,
+        category=category,
+        description=combined_description,
+        name=name,
+        name_en=name_en,
+        name_ur=name_ur,
+        # Labelled for all records at once by save_city_data (see label_languages)
+        language=None,
+        location=city_name,
+        osm_tag_key=primary_key,
+        osm_tag_value=primary_value,
+        latitude=lat,
+        longitude=lon,
+        all_tags=tags,
+        version=(getattr(element, 'attributes', None) or {}).get('version'),
+        collected_at=collected_at or datetime.now().isoformat(),
+        parts=compact_parts(parts) if parts else None,
+    )
+
+
+def ring_centroid(points):
+    """
+    Centroid of a list of (lat, lon) points: area-weighted for closed rings,
+    mean of the vertices otherwise. Returns (lat, lon, area) with area in square degrees
+    """
+    points = [(float(lat), float(lon)) for lat, lon in points]
+    if not points:
+        return None, None, 0.0
+
+    if len(points) >= 4 and points[0] == points[-1]:
+        # Shoelace formula, shifted to the first vertex for numerical stability
+        lat0, lon0 = points[0]
+        area2 = cx = cy = 0.0
+        for (y1, x1), (y2, x2) in zip(points, points[1:]):
+            x1, y1, x2, y2 = x1 - lon0, y1 - lat0, x2 - lon0, y2 - lat0
+            cross = x1 * y2 - x2 * y1
+            area2 += cross
+            cx += (x1 + x2) * cross
+            cy += (y1 + y2) * cross
+        if area2:
+            return lat0 + cy / (3 * area2), lon0 + cx / (3 * area2), abs(area2) / 2
+        points = points[:-1]
+
+    lat = sum(p[0] for p in points) / len(points)
+    lon = sum(p[1] for p in points) / len(points)
+    return lat, lon, 0.0
+
+
+def parts_centroid(parts):
+    """
+    Centroid of a feature made of several point lists (e.g. relation members):
+    closed rings are weighted by area, falling back to the mean of all vertices
+    """
+    weighted = [ring_centroid(points) for points in parts if points]
+    total_area = sum(area for _, _, area in weighted)
+    if total_area:
+        lat = sum(c_lat * area for c_lat, _, area in weighted) / total_area
+        lon = sum(c_lon * area for _, c_lon, area in weighted) / total_area
+        return lat, lon
+
+    all_points = [(float(lat), float(lon)) for points in parts for lat, lon in points]
+    if not all_points:
+        return None, None
+    return (sum(p[0] for p in all_points) / len(all_points),
+            sum(p[1] for p in all_points) / len(all_points))
+
+
+def way_points(way):
+    """(lat, lon) points of a way from its inline geometry ('geom') or its resolved nodes ('recurse')"""
+    geometry = (way.attributes or {}).get('geometry')
+    if geometry:
+        return [(p['lat'], p['lon']) for p in geometry]
+    try:
+        return [(node.lat, node.lon) for node in way.nodes]
+    except overpy.exception.DataIncomplete:
+        return []
+
+
+def relation_parts(relation):
+    """Point lists of a relation's members, preferring 'outer' members when the relation has any"""
+    members = relation.members
+    outer = [m for m in members if m.role == 'outer']
+    parts = []
+    for member in outer or members:
+        if member.geometry:
+            parts.append([(p.lat, p.lon) for p in member.geometry])
+        elif member.attributes and 'lat' in member.attributes:
+            parts.append([(member.attributes['lat'], member.attributes['lon'])])
+        elif isinstance(member, (overpy.RelationWay, overpy.RelationNode)):
+            try:
+                resolved = member.resolve()
+            except overpy.exception.DataIncomplete:
+                continue
+            if isinstance(resolved, overpy.Way):
+                parts.append(way_points(resolved))
+            else:
+                parts.append([(resolved.lat, resolved.lon)])
+    return parts
+
+
+def element_parts(element, element_type):
+    """
+    Point lists of a way (one list) or relation (one per member) from its geometry;
+    None for nodes and for 'center' mode results, which carry no geometry
+    """
+    if element_type == 'node' or getattr(element, 'center_lat', None) is not None:
+        return None
+    if element_type == 'way':
+        return [way_points(element)]
+    if element_type == 'relation':
+        return relation_parts(element)
+    return None
+
+
+def element_coordinates(element, element_type, parts=None):
+    """
+    Coordinates of an OSM element: the node position, the server-side center ('center' mode),
+    or a centroid computed from the way/relation geometry ('geom' and 'recurse' modes)
+    parts are the element's point lists when element_parts was already called
+    """
+    if element_type == 'node':
+        return element.lat, element.lon
+
+    if getattr(element, 'center_lat', None) is not None:
+        return element.center_lat, element.center_lon
+
+    if parts is None:
+        parts = element_parts(element, element_type)
+    if element_type == 'way':
+        lat, lon, _ = ring_centroid(parts[0])
+    elif element_type == 'relation':
+        lat, lon = parts_centroid(parts)
+    else:
+        lat, lon = None, None
+
+    if lat is None:
+        return None, None
+    # OSM stores coordinates with 7 decimal places
+    return round(lat, 7), round(lon, 7)
+
+
+def label_languages(records):
+    """
+    Set the language of every record from the script of its description, in one batch
+    detection over the whole description column; records may mix OSMRecords and dicts
+    """
+    labels = detect_languages([record.get('description') for record in records])['language']
+    for record, language in zip(records, labels):
+        if isinstance(record, dict):
+            record['language'] = language
+        else:
+            record.language = sys.intern(language)
+
+
+def save_city_data(city, osm_data, data_dir=DATA_DIR, formats=DEFAULT_FORMATS, dataset_dir=DEFAULT_DATASET_DIR,
+                   store_path=DEFAULT_STORE_FILE, vocab_path=DEFAULT_VOCAB_FILE, archive=None):
+    """
+    Print a summary of the collected data and save it in the requested formats:
+    'csv', raw 'ndjson' archive, legacy raw 'json', 'parquet' (the city's partitions of
+    the dataset in dataset_dir, with tag ids from the shared vocabulary at vocab_path)
+    and/or 'sqlite' (the city's places in the store at store_path)
+
+    archive is the open RawArchiveWriter the records were streamed into by collect_city;
+    it replaces the 'ndjson' archive on success and is discarded when nothing was collected
+    """
+    name = city['name']
+    print(f"\n🎉 [{name}] Collection complete! Found {len(osm_data)} entries with descriptions.")
+
+    # Convert to DataFrame for analysis
+    label_languages(osm_data)
+    df = records_frame(osm_data)
+
+    if len(df) == 0:
+        print(f"⚠️ [{name}] No data collected. This might be due to network issues or API limits.")
+        if archive is not None:
+            archive.abort()
+        return None
+
+    print(f"\n📊 [{name}] Data Summary:")
+    print(f"Total entries: {len(df)}")
+    print(f"Categories: {df['category'].str.split(CATEGORY_SEPARATOR).explode().value_counts().to_dict()}")
+    print(f"Languages: {df['language'].value_counts().to_dict()}")
+    print(f"Top OSM tags: {df['osm_tag_key'].value_counts().head().to_dict()}")
+
+    # Show sample entries
+    print(f"\n📝 [{name}] Sample entries:")
+    for i, row in df.head(5).iterrows():
+        print(f"{i + 1}. {row['name']} ({row['osm_tag_key']}={row['osm_tag_value']})")
+        print(f"   Description: {row['description'][:100]}...")
+        print(f"   Language: {row['language']}, Location: {row['coordinates']}")
+        print()
+
+    # Ensure the data directory exists
+    os.makedirs(data_dir, exist_ok=True)
+
+    output_file = os.path.join(data_dir, f"{city['slug']}_osm_data.csv")
+    raw_json_file = os.path.join(data_dir, f"{city['slug']}_osm_raw.json")
+
+    # Save CSV
+    if 'csv' in formats:
+        df.to_csv(output_file, index=False, encoding='utf-8')
+        print(f"💾 [{name}] Data saved to: {output_file}")
+
+    # Save raw records, one compressed JSON line each
+    if 'ndjson' in formats:
+        if archive is not None:
+            archive.close()
+            archive_file = archive.path
+        else:
+            archive_file = raw_archive_path(data_dir, city['slug'])
+            write_raw_archive(archive_file, osm_data)
+        print(f"💾 [{name}] Raw data saved to: {archive_file}")
+
+    # Save legacy pretty-printed JSON (Decimals are encoded on the fly)
+    if 'json' in formats:
+        with open(raw_json_file, 'w', encoding='utf-8') as f:
+            json.dump(osm_data, f, ensure_ascii=False, indent=2, cls=DecimalEncoder)
+        print(f"💾 [{name}] Raw data saved to: {raw_json_file}")
+
+    # Save typed columnar dataset
+    if 'parquet' in formats:
+        vocabulary = TagVocabulary(vocab_path)
+        try:
+            city_dir = write_city_dataset(osm_data, city['slug'], dataset_dir, vocabulary)
+        finally:
+            vocabulary.close()
+        print(f"💾 [{name}] Parquet partitions saved to: {city_dir}")
+
+    # Save into the indexed place store
+    if 'sqlite' in formats:
+        store = PlaceStore(store_path)
+        try:
+            store.replace_city(name, osm_data)
+        finally:
+            store.close()
+        print(f"💾 [{name}] Places saved to: {store_path}")
+
+    return output_file
+
+
+def update_city(city, data_dir=DATA_DIR, sync_state=None, formats=DEFAULT_FORMATS, **collect_options):
+    """
+    Incrementally refresh one city: fetch only elements changed since the last sync of
+    each query group and upsert them into the existing dataset. Groups that were never
+    synced (or a city without previous output) are collected in full.
+    Returns the number of entries in the updated dataset
+
+    Deleted elements and elements that lost their matching tags are not removed;
+    run a full collection from time to time to drop them.
+    """
+    sync_state = sync_state or SyncState()
+    archive_file = raw_archive_path(data_dir, city['slug'])
+    if not os.path.exists(archive_file):
+        # Cities last saved with the legacy raw JSON dump
+        archive_file = os.path.join(data_dir, f"{city['slug']}_osm_raw.json")
+    existing = load_raw_records(archive_file)
+
+    query_mode = collect_options.get('query_mode', 'category')
+    labels = [label for label, _ in query_plan(city['categories'], query_mode)]
+    since = sync_state.since(city['slug'], labels) if existing else {}
+
+    sync_times = {}
+    updates = collect_city(city, since=since, sync_times=sync_times, **collect_options)
+
+    # Per-category rows repeat an element once per category, merged rows hold it once
+    keys = ('element_type', 'osm_id') if query_mode == 'merged' else ('element_type', 'osm_id', 'category')
+    osm_data = upsert_records(existing, updates, keys)
+    print(f"🔁 [{city['name']}] {len(updates)} changed entries merged into {len(existing)} existing ones")
+
+    save_city_data(city, osm_data, data_dir, formats)
+    sync_state.record(city['slug'], sync_times)
+    return len(osm_data)
+
+
+def collect_and_save_city(city, data_dir=DATA_DIR, incremental=False, sync_state=None, formats=DEFAULT_FORMATS,
+                          **collect_options):
+    """
+    Collect one city and write its output files, returning the number of entries
+    collect_options are passed on to collect_city (query_mode, geometry, ...)
+    """
+    if incremental:
+        return update_city(city, data_dir, sync_state, formats, **collect_options)
+
+    # The raw archive is written while the city is collected
+    archive = RawArchiveWriter(raw_archive_path(data_dir, city['slug'])) if 'ndjson' in formats else None
+    try:
+        osm_data = collect_city(city, archive=archive, **collect_options)
+        save_city_data(city, osm_data, data_dir, formats, archive=archive)
+    finally:
+        if archive is not None and not archive.closed:
+            archive.abort()
+    return len(osm_data)
+
+
+def collect_cities(cities, max_workers=DEFAULT_MAX_WORKERS, data_dir=DATA_DIR, **collect_options):
+    """
+    Collect several cities concurrently on a bounded worker pool
+    Returns a {city name: number of entries} dict; failed cities map to None
+    All cities share one request scheduler, so together they never exceed the server's slots
+    """
+    results = {}
+    start = time.time()
+
+    collect_options.setdefault('scheduler', RequestScheduler())
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(collect_and_save_city, city, data_dir, **collect_options): city['name'] for city in cities}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"❌ [{name}] Collection failed: {str(e)}")
+                results[name] = None
+
+    print(f"\n⏱️ Collected {len(cities)} cities in {time.time() - start:.1f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect OSM place descriptions for the cities in the city table")
+    parser.add_argument("--cities", nargs="+", help="City names to collect (default: every city in the table)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Number of cities collected at once")
+    parser.add_argument("--city-table", default=CITY_TABLE, help="CSV file with the city definitions")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Output directory for the collected data")
+    parser.add_argument("--query-mode", choices=["category", "merged"], default="category",
+                        help="One query per category, or one merged query per city with local category assignment")
+    parser.add_argument("--geometry", choices=sorted(GEOMETRY_OUTPUTS), default="recurse",
+                        help="How way/relation coordinates are obtained: member node recursion, "
+                             "server-side centers, or inline geometries")
+    parser.add_argument("--tile-size", type=float, default=None,
+                        help="Fetch each city as tiles of this many degrees, splitting tiles that time out")
+    parser.add_argument("--tile-workers", type=int, default=DEFAULT_TILE_WORKERS, help="Parallel tile fetches per city")
+    parser.add_argument("--request-interval", type=float, default=0.0,
+                        help="Minimum seconds between two requests on top of the server's slot status")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help="Retries for rate-limited, overloaded or failed requests")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory of the Overpass response cache")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_HOURS, help="Hours before a cached response expires")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_MB, help="Cache size limit before oldest entries are evicted")
+    parser.add_argument("--offline", action="store_true", help="Replay cached responses only, never contact the server")
+    parser.add_argument("--no-cache", action="store_true", help="Always query the server and do not store responses")
+    parser.add_argument("--stream", action="store_true",
+                        help="Parse Overpass responses incrementally (needs --geometry center or geom)")
+    parser.add_argument("--formats", nargs="+", choices=OUTPUT_FORMATS, default=list(DEFAULT_FORMATS),
+                        help="Output formats; ndjson writes <city>_osm_raw.ndjson.gz, json the legacy raw dump, parquet writes "
+                             "data/osm_parquet/city=<city>/category=<category>/, sqlite data/osm_places.sqlite")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch elements changed since the last sync and upsert them into the existing data")
+    parser.add_argument("--sync-state", default=DEFAULT_STATE_FILE, help="JSON file with the last sync time per city and group")
+    args = parser.parse_args()
+
+    if args.stream and args.geometry == 'recurse':
+        parser.error("--stream needs --geometry center or geom")
+    if args.offline and args.no_cache:
+        parser.error("--offline replays the cache and cannot be combined with --no-cache")
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache_dir, ttl_hours=args.cache_ttl, max_mb=args.cache_max_mb, offline=args.offline)
+
+    cities = load_cities(args.city_table, names=args.cities)
+    print(f"🌍 Collecting {len(cities)} cities with {args.workers} workers: {', '.join(c['name'] for c in cities)}")
+
+    results = collect_cities(cities, max_workers=args.workers, data_dir=args.data_dir,
+                             query_mode=args.query_mode, geometry=args.geometry,
+                             tile_size=args.tile_size, tile_workers=args.tile_workers,
+                             scheduler=RequestScheduler(max_retries=args.max_retries, min_interval=args.request_interval),
+                             cache=cache, streaming=args.stream,
+                             incremental=args.incremental, formats=args.formats,
+                             sync_state=SyncState(args.sync_state) if args.incremental else None)
+    for name, count in results.items():
+        status = f"{count} entries" if count is not None else "failed"
+        print(f"   - {name}: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# Typed columnar (Parquet) output for collected OSM data
+# Writes a hive-partitioned dataset data/osm_parquet/city=<slug>/category=<category>/
+# with float64 coordinates, a map column for the tags and dictionary-encoded labels,
+# so readers can project columns and push filters down instead of re-parsing CSV strings.
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from osm_records import records_frame, CATEGORY_SEPARATOR
+from osm_geometry import build_geometries, geometry_columns
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DEFAULT_DATASET_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "osm_parquet"))
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet output needs pyarrow: pip install pyarrow")
+
+
+def osm_schema():
+    """Arrow schema of the columnar OSM dataset (partition columns city/category excluded)"""
+    require_pyarrow()
+    label = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('osm_id', pa.int64()),
+        ('element_type', label),
+        ('categories', pa.list_(label)),
+        ('description', pa.string()),
+        ('name', pa.string()),
+        ('name_en', pa.string()),
+        ('name_ur', pa.string()),
+        ('language', label),
+        ('location', label),
+        ('osm_tag_key', label),
+        ('osm_tag_value', label),
+        ('source', label),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64()),
+        ('all_tags', pa.map_(pa.string(), pa.string())),
+        ('version', pa.int64()),
+        ('collected_at', pa.timestamp('us')),
+    ])
+
+
+def frame_to_table(df, city_slug, vocabulary=None):
+    """
+    Convert a DataFrame of collected records into an Arrow table, column by column
+
+    A record with several categories (merged mode) gets one row per category, so it is
+    found in every one of its 'category' partitions; 'categories' keeps all of them and
+    'category_index' is the position of the row's category in that list.
+    With a TagVocabulary, 'osm_tag_id' and 'tag_ids' hold the pair ids of the primary tag
+    and of all tags. The geometry columns (WKB, area_m2 and bbox) are built in one batch
+    from the 'parts' column; rows without parts get a point at their coordinates
+    """
+    require_pyarrow()
+    schema = osm_schema()
+    categories = df['category'].astype(str).str.split(CATEGORY_SEPARATOR)
+
+    arrays = []
+    for field in schema:
+        name = field.name
+        if name == 'categories':
+            array = pa.array(categories, pa.list_(pa.string())).cast(field.type)
+        elif name == 'all_tags':
+            array = pa.array([list(tags.items()) if isinstance(tags, dict) else None for tags in df[name]], field.type)
+        elif name in ('latitude', 'longitude'):
+            array = pa.array(pd.to_numeric(df[name], errors='coerce'), field.type, from_pandas=True)
+        elif name in ('osm_id', 'version'):
+            values = df[name] if name in df else pd.Series(None, index=df.index, dtype=object)
+            array = pa.array(pd.to_numeric(values, errors='coerce').astype('Int64'), field.type)
+        elif name == 'collected_at':
+            array = pa.array(pd.to_datetime(df[name], errors='coerce', format='ISO8601'), field.type)
+        else:
+            array = pa.array(df[name].astype(object).where(df[name].notna(), None), pa.string())
+            if pa.types.is_dictionary(field.type):
+                array = array.dictionary_encode()
+        arrays.append(array)
+
+    table = pa.Table.from_arrays(arrays, schema=schema)
+
+    parts = df['parts'] if 'parts' in df.columns else [None] * len(df)
+    geometries = build_geometries(list(parts), pd.to_numeric(df['latitude'], errors='coerce'),
+                                  pd.to_numeric(df['longitude'], errors='coerce'))
+    for name, values in geometry_columns(geometries).items():
+        table = table.append_column(name, pa.array(values, pa.binary() if name == 'geometry' else pa.float64(),
+                                                   from_pandas=True))
+
+    if vocabulary is not None:
+        primary = zip(df['osm_tag_key'].fillna(''), df['osm_tag_value'].fillna(''))
+        table = table.append_column('osm_tag_id', pa.array(vocabulary.pair_ids(primary), pa.int32()))
+        indptr, indices = vocabulary.tag_matrix(df['all_tags'])
+        table = table.append_column('tag_ids', pa.ListArray.from_arrays(pa.array(indptr.astype(np.int32)),
+                                                                         pa.array(indices, pa.int32())))
+    table = table.append_column('city', pa.array([city_slug] * len(df), pa.string()).dictionary_encode())
+
+    # One row per (record, category) for the category partitions
+    counts = categories.str.len().to_numpy()
+    if (counts > 1).any():
+        table = table.take(pa.array(np.repeat(np.arange(len(df)), counts)))
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    table = table.append_column('category_index', pa.array(np.arange(counts.sum()) - starts, pa.int8()))
+    category = pa.array(categories.explode().to_numpy(dtype=object), pa.string())
+    return table.append_column('category', category.dictionary_encode())
+
+
+def records_to_table(records, city_slug, vocabulary=None):
+    """Convert collected records (OSMRecords from process_osm_element, or loaded dicts) into an Arrow table"""
+    df = records_frame(records)
+    df['parts'] = [record.get('parts') for record in records]
+    return frame_to_table(df, city_slug, vocabulary)
+
+
+def write_city_dataset(records, city_slug, dataset_dir=DEFAULT_DATASET_DIR, vocabulary=None):
+    """
+    Replace the city's partitions of the Parquet dataset with the given records
+    Returns the city's partition directory
+    """
+    require_pyarrow()
+    table = records_to_table(records, city_slug, vocabulary) if records else None
+    return write_city_table(table, city_slug, dataset_dir)
+
+
+def write_city_table(table, city_slug, dataset_dir=DEFAULT_DATASET_DIR):
+    """Replace the city's partitions of the Parquet dataset with an Arrow table from frame_to_table"""
+    require_pyarrow()
+    city_dir = os.path.join(dataset_dir, f"city={city_slug}")
+
+    # Drop the old partitions first so categories that are no longer collected disappear
+    if os.path.isdir(city_dir):
+        shutil.rmtree(city_dir)
+
+    if table is not None and table.num_rows:
+        pq.write_to_dataset(table, dataset_dir, partition_cols=['city', 'category'],
+                            basename_template='part-{i}.parquet', existing_data_behavior='overwrite_or_ignore')
+    return city_dir
+
+
+def filter_columns(filters):
+    """Column names referenced by pyarrow filters (a list of tuples, or a list of lists of tuples)"""
+    columns = set()
+    for item in filters or ():
+        for predicate in (item if isinstance(item, list) else [item]):
+            columns.add(predicate[0])
+    return columns
+
+
+def read_dataset(dataset_dir=DEFAULT_DATASET_DIR, columns=None, filters=None):
+    """
+    Load the Parquet dataset as a DataFrame
+
+    columns limits the columns read from disk; filters uses pyarrow's predicate syntax,
+    e.g. [('city', '=', 'lahore'), ('language', '=', 'Urdu')], and skips non-matching
+    partitions and row groups. Unless filtering on 'category', records stored in several
+    category partitions are returned once (their copy with category_index 0)
+    """
+    require_pyarrow()
+    if 'category' in filter_columns(filters):
+        return pq.read_table(dataset_dir, columns=columns, filters=filters, partitioning='hive').to_pandas()
+
+    read_columns = None if columns is None else list(dict.fromkeys(list(columns) + ['category_index']))
+    df = pq.read_table(dataset_dir, columns=read_columns, filters=filters, partitioning='hive').to_pandas()
+    if 'category_index' in df:
+        # Partitions written before category_index existed hold one row per record
+        df = df[df['category_index'].isna() | (df['category_index'] == 0)].reset_index(drop=True)
+    return df if columns is None else df[list(columns)]
@@ -0,0 +1,168 @@
+# Cross-city deduplication of collected OSM elements
+# Merges the outputs of all cities, collapses rows of the same element (fetched for several
+# cities or categories), then finds near-duplicate features - the same normalized name within
+# a few metres - with a spatial hash grid, so each row is only compared with its neighbours.
+import os
+import re
+import math
+import argparse
+import unicodedata
+import numpy as np
+import pandas as pd
+from osm_collector import DATA_DIR, CITY_TABLE, CATEGORY_SEPARATOR, load_cities
+from osm_legacy import legacy_files, load_legacy_csv
+from osm_geometry import METERS_PER_DEGREE, haversine_m
+
+DEFAULT_MERGED_FILE = os.path.join(DATA_DIR, "osm_all_cities_dedup.csv")
+# Features with the same normalized name closer than this are treated as one place
+DEFAULT_DISTANCE_M = 25.0
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_name(name):
+    """Case-, width- and punctuation-insensitive form of a name; '' for missing names"""
+    if not isinstance(name, str):
+        return ''
+    return _NON_WORD.sub(' ', unicodedata.normalize('NFKC', name).casefold()).strip()
+
+
+def join_unique(values):
+    seen = []
+    for value in values:
+        for part in str(value).split(CATEGORY_SEPARATOR):
+            if part and part not in seen:
+                seen.append(part)
+    return CATEGORY_SEPARATOR.join(seen)
+
+
+def containing_city(df, cities):
+    """Name of the first city whose bbox contains each row's point, or None"""
+    result = pd.Series(None, index=df.index, dtype=object)
+    for city in cities:
+        south, west, north, east = city['bbox']
+        inside = df['latitude'].between(south, north) & df['longitude'].between(west, east)
+        result = result.where(result.notna() | ~inside, city['name'])
+    return result
+
+
+def collapse_elements(df, cities):
+    """
+    One row per (element_type, osm_id): the newest copy (highest version, then latest
+    collected_at) is kept whole, categories of all copies are joined, and the location is
+    the city whose bbox actually contains the element (else the kept copy's location)
+    """
+    df = df.copy()
+    df['location'] = containing_city(df, cities).fillna(df['location'])
+    keys = ['element_type', 'osm_id']
+    categories = df.groupby(keys, sort=False)['category'].agg(join_unique)
+
+    # Legacy files carry neither column; their first copy is kept
+    order = [column for column in ('version', 'collected_at') if column in df.columns]
+    if order:
+        df = df.sort_values(order, ascending=False, na_position='last', kind='stable')
+    collapsed = df.drop_duplicates(keys).set_index(keys)
+    collapsed['category'] = categories
+    return collapsed.reset_index()[df.columns]
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = np.arange(size)
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def near_duplicate_groups(df, distance_m=DEFAULT_DISTANCE_M):
+    """
+    Cluster label per row: rows with the same normalized name within distance_m metres
+    share a label (transitively). Rows are bucketed into grid cells at least distance_m wide,
+    so each row is only compared with same-name rows in its own and the 8 adjacent cells
+    """
+    names = df['name'].map(normalize_name).to_numpy()
+    lat = df['latitude'].to_numpy(dtype=float)
+    lon = df['longitude'].to_numpy(dtype=float)
+    valid = (names != '') & ~np.isnan(lat) & ~np.isnan(lon)
+
+    groups = UnionFind(len(df))
+    if not valid.any():
+        return groups.parent
+
+    # Longitude degrees shrink towards the poles: size cells for the highest latitude present
+    cell_lat = distance_m / METERS_PER_DEGREE
+    cell_lon = distance_m / (METERS_PER_DEGREE * max(math.cos(math.radians(np.abs(lat[valid]).max())), 1e-6))
+    cell_y = np.floor(lat / cell_lat)
+    cell_x = np.floor(lon / cell_lon)
+
+    grid = {}
+    for i in np.flatnonzero(valid):
+        grid.setdefault((names[i], cell_y[i], cell_x[i]), []).append(i)
+
+    for (name, y, x), members in grid.items():
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                neighbours = grid.get((name, y + dy, x + dx))
+                if not neighbours:
+                    continue
+                for i in members:
+                    for j in neighbours:
+                        if i < j and haversine_m(lat[i], lon[i], lat[j], lon[j]) <= distance_m:
+                            groups.union(i, j)
+
+    return np.array([groups.find(i) for i in range(len(df))])
+
+
+def deduplicate(df, cities, distance_m=DEFAULT_DISTANCE_M):
+    """
+    Merge the rows of all cities into one row per place
+    Near-duplicates keep the row with the most tags; 'merged_ids' lists the
+    element_type/osm_id of the rows folded into it
+    """
+    df = collapse_elements(df, cities).reset_index(drop=True)
+    df['group'] = near_duplicate_groups(df, distance_m)
+    df['tag_count'] = df['all_tags'].map(lambda tags: len(tags) if isinstance(tags, dict) else 0)
+    df['element'] = df['element_type'] + '/' + df['osm_id'].astype(str)
+
+    # Richest row of each group first
+    df = df.sort_values(['group', 'tag_count'], ascending=[True, False], kind='stable')
+    grouped = df.groupby('group', sort=False)
+    kept = grouped.head(1).set_index('group')
+    kept['category'] = grouped['category'].agg(join_unique)
+    kept['merged_ids'] = grouped['element'].agg(lambda elements: ' '.join(elements.iloc[1:]))
+    return kept.drop(columns=['tag_count', 'element']).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge all city outputs and remove duplicate OSM places")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory with the collected city CSV files")
+    parser.add_argument("--city-table", default=CITY_TABLE, help="CSV file with the city definitions")
+    parser.add_argument("--distance", type=float, default=DEFAULT_DISTANCE_M,
+                        help="Metres within which same-name features are merged")
+    parser.add_argument("--output", default=DEFAULT_MERGED_FILE, help="CSV file of the merged places")
+    args = parser.parse_args()
+
+    frames = [load_legacy_csv(path) for path in legacy_files(args.data_dir).values()]
+    if not frames:
+        print(f"❌ No collected data found in {args.data_dir}")
+        return
+    df = pd.concat(frames, ignore_index=True)
+
+    merged = deduplicate(df, load_cities(args.city_table), args.distance)
+    merged.to_csv(args.output, index=False, encoding='utf-8')
+    folded = (merged['merged_ids'] != '').sum()
+    print(f"🧬 {len(df)} rows -> {len(merged)} places ({folded} with near-duplicates merged) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
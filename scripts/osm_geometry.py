@@ -0,0 +1,121 @@
+# Batch geometry stage for collected OSM elements
+# Builds points, lines and polygons for a whole batch of elements with shapely's vectorized
+# constructors (one call per geometry kind instead of one object per element), and derives
+# WKB, area and bounding box columns for storage.
+import math
+import numpy as np
+import shapely
+
+# Meters per degree of latitude; areas are scaled by cos(latitude) for longitude
+METERS_PER_DEGREE = 111_320.0
+EARTH_RADIUS_M = 6_371_000.0
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def compact_parts(parts):
+    """
+    Store a feature's point lists as float64 (n, 2) arrays of (lon, lat), or None
+    when there is no geometry; the form kept on records and in the raw archive
+    """
+    arrays = [np.array([(float(lon), float(lat)) for lat, lon in points], dtype=np.float64)
+              for points in parts if points]
+    return arrays or None
+
+
+def _flatten(groups):
+    """Concatenate (n, 2) arrays into one coordinate array plus the group index of every row"""
+    coords = np.concatenate(groups)
+    indices = np.repeat(np.arange(len(groups)), [len(g) for g in groups])
+    return coords, indices
+
+
+def _group(parts, owners, multi):
+    """
+    {feature index: geometry} from per-part geometries and their owning feature: the parts
+    of each feature are combined with the multi constructor, single parts are kept as they are
+    """
+    owners = np.asarray(owners)
+    order = np.argsort(owners, kind='stable')
+    parts, owners = parts[order], owners[order]
+    unique, first, counts = np.unique(owners, return_index=True, return_counts=True)
+    combined = multi(parts, indices=np.searchsorted(unique, owners))
+    return {owner: parts[f] if n == 1 else geometry for owner, f, n, geometry in zip(unique, first, counts, combined)}
+
+
+def build_geometries(parts_list, latitudes, longitudes):
+    """
+    Geometry per feature as a numpy object array (None where there is nothing to build)
+
+    parts_list holds each feature's point arrays from compact_parts (None for nodes).
+    Closed rings become (multi)polygons, other parts (multi)linestrings; relations made of
+    open member ways are assembled with polygonize; features without parts become points
+    """
+    count = len(parts_list)
+    geometries = np.full(count, None, dtype=object)
+
+    rings, ring_owner, lines, line_owner = [], [], [], []
+    for i, parts in enumerate(parts_list):
+        for points in parts if parts is not None else ():
+            points = np.asarray(points, dtype=np.float64)
+            if len(points) >= 4 and np.array_equal(points[0], points[-1]):
+                rings.append(points)
+                ring_owner.append(i)
+            elif len(points) >= 2:
+                lines.append(points)
+                line_owner.append(i)
+
+    # Points for features without any part (nodes, or 'center' mode ways and relations)
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    no_parts = np.array([not parts for parts in parts_list], dtype=bool) & ~np.isnan(latitudes) & ~np.isnan(longitudes)
+    geometries[no_parts] = shapely.points(longitudes[no_parts], latitudes[no_parts])
+
+    line_geometries = {}
+    if lines:
+        coords, indices = _flatten(lines)
+        line_geometries = _group(shapely.linestrings(coords, indices=indices), line_owner, shapely.multilinestrings)
+
+    polygon_geometries = {}
+    if rings:
+        coords, indices = _flatten(rings)
+        polygons = shapely.polygons(shapely.linearrings(coords, indices=indices))
+        polygon_geometries = _group(polygons, ring_owner, shapely.multipolygons)
+    for owner, geometry in polygon_geometries.items():
+        geometries[owner] = geometry
+
+    for owner, geometry in line_geometries.items():
+        if owner in polygon_geometries:
+            continue
+        # Relations whose outer ring is split over several member ways
+        if shapely.get_num_geometries(geometry) > 1:
+            assembled = shapely.polygonize(shapely.get_parts(geometry))
+            if not shapely.is_empty(assembled):
+                geometries[owner] = shapely.union_all(shapely.get_parts(assembled))
+                continue
+        geometries[owner] = geometry
+
+    return geometries
+
+
+def geometry_columns(geometries):
+    """
+    {column: array} of WKB, area in square meters and bounding box for an array of
+    geometries (approximate area from the local degree scale at the feature's centroid)
+    """
+    centroid_lat = shapely.get_y(shapely.centroid(geometries))
+    area_m2 = shapely.area(geometries) * METERS_PER_DEGREE ** 2 * np.cos(np.radians(centroid_lat))
+    min_lon, min_lat, max_lon, max_lat = shapely.bounds(geometries).T
+    return {
+        'geometry': shapely.to_wkb(geometries),
+        'area_m2': area_m2,
+        'min_lat': min_lat,
+        'min_lon': min_lon,
+        'max_lat': max_lat,
+        'max_lon': max_lon,
+    }
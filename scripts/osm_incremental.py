@@ -0,0 +1,93 @@
+# Incremental OSM collection helpers
+# Keeps the time of the last successful sync per city and query group, and merges
+# changed elements into an existing city dataset keyed by (element_type, osm_id).
+import os
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from osm_raw_archive import iter_raw_archive
+
+DEFAULT_STATE_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "osm_sync_state.json"))
+
+# Sync times are moved back by this margin because the Overpass database trails the
+# main OSM database by a few minutes; elements fetched twice are simply upserted again
+SYNC_OVERLAP = timedelta(hours=1)
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def format_newer(timestamp):
+    """Format a datetime for an Overpass newer:"..." filter"""
+    return timestamp.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class SyncState:
+    """
+    Last successful sync time per city and query group (a category, or 'merged'),
+    persisted as JSON: {"peshawar": {"amenities": "2025-07-29T09:21:27Z", ...}, ...}
+    """
+
+    def __init__(self, path=DEFAULT_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def last_sync(self, city_slug, label):
+        """Datetime of the last successful sync, or None if the group was never synced"""
+        value = self.state.get(city_slug, {}).get(label)
+        if not value:
+            return None
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+    def since(self, city_slug, labels):
+        """{label: newer filter timestamp} for the synced groups of a city"""
+        since = {}
+        for label in labels:
+            last = self.last_sync(city_slug, label)
+            if last is not None:
+                since[label] = format_newer(last - SYNC_OVERLAP)
+        return since
+
+    def record(self, city_slug, sync_times):
+        """Store {label: datetime} sync times for a city and write the state file"""
+        with self._lock:
+            city_state = self.state.setdefault(city_slug, {})
+            for label, timestamp in sync_times.items():
+                city_state[label] = format_newer(timestamp)
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def upsert_records(existing, updates, keys=('element_type', 'osm_id')):
+    """
+    Merge updated records into existing ones: records with the same key values are
+    replaced in place, new records are appended
+    """
+    merged = {tuple(record[k] for k in keys): record for record in existing}
+    for record in updates:
+        merged[tuple(record[k] for k in keys)] = record
+    return list(merged.values())
+
+
+def load_raw_records(path):
+    """
+    Load the raw records of a previous collection run from an NDJSON archive or a
+    legacy JSON dump, or [] if there are none
+    """
+    if not os.path.exists(path):
+        return []
+    if path.endswith(('.ndjson', '.ndjson.gz')):
+        return list(iter_raw_archive(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
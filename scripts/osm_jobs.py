@@ -0,0 +1,417 @@
+# Durable, resumable collection job queue
+# Collection is split into tasks (city x query group x tile) recorded in a local SQLite
+# database with their status, attempt count and result file. Any number of worker
+# processes lease tasks from it; a task whose worker died is leased again once its lease
+# expires, so a restarted run resumes with the tasks that were not finished yet.
+import os
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from collections import namedtuple
+from osm_collector import (DATA_DIR, CITY_TABLE, GEOMETRY_OUTPUTS, OUTPUT_FORMATS, DEFAULT_FORMATS,
+                           load_cities, query_plan, collect_city, save_city_data)
+from osm_raw_archive import RawArchiveWriter, iter_raw_archive
+from osm_tiling import grid_tiles, describe_tile, DEFAULT_TILE_WORKERS
+from overpass_cache import ResponseCache, DEFAULT_CACHE_DIR
+from overpass_scheduler import RequestScheduler
+
+DEFAULT_QUEUE_FILE = os.path.join(DATA_DIR, "osm_jobs.sqlite")
+# Per-task result archives live below this directory: <city>/<label>/<task id>.ndjson.gz
+DEFAULT_RESULTS_DIR = os.path.join(DATA_DIR, "jobs")
+
+# A leased task is handed out again when its worker has not renewed or finished it within this time
+DEFAULT_LEASE_SECONDS = 30 * 60
+# Running tasks renew their lease after this share of the lease time has passed
+LEASE_RENEW_SHARE = 1 / 3
+# Failed tasks are retried until they have been attempted this often
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cities (
+    slug TEXT PRIMARY KEY,
+    query_mode TEXT NOT NULL,
+    geometry TEXT NOT NULL,
+    assembled_at REAL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    city TEXT NOT NULL REFERENCES cities(slug),
+    label TEXT NOT NULL,
+    bbox TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result_path TEXT,
+    result_count INTEGER,
+    error TEXT,
+    updated_at REAL,
+    UNIQUE (city, label, bbox)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, city);
+"""
+
+Task = namedtuple('Task', ['id', 'city', 'label', 'bbox', 'attempts', 'query_mode', 'geometry'])
+
+
+def format_task_bbox(bbox):
+    return ",".join(f"{v:.6f}" for v in bbox)
+
+
+def parse_task_bbox(text):
+    return tuple(float(v) for v in text.split(','))
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    SQLite-backed task queue shared by worker processes
+
+    Task status goes pending -> leased -> done, or back to pending/failed on errors:
+    failed tasks are retried until max_attempts, and leases that expired (the worker
+    crashed or was killed) are taken over by the next lease() call
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def transaction(self):
+        """Take the database write lock up front, so two workers never lease the same task"""
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def enqueue_city(self, city, query_mode='category', geometry='recurse', tile_size=None):
+        """
+        Add the tasks of a city: one per query group, or one per group and grid tile with
+        tile_size. Tasks that already exist keep their status; tasks of an earlier enqueue
+        that are not part of this plan (another tile size), or all of them when the query
+        mode or geometry changed, are removed with their results.
+        Returns (tasks added, tasks removed)
+        """
+        tiles = grid_tiles(city['bbox'], tile_size) if tile_size else [city['bbox']]
+        planned = {(label, format_task_bbox(tile))
+                   for label, _ in query_plan(city['categories'], query_mode) for tile in tiles}
+        db = self.transaction()
+        try:
+            previous = db.execute("SELECT query_mode, geometry FROM cities WHERE slug = ?", (city['slug'],)).fetchone()
+            stale = [(task_id, result_path) for task_id, label, bbox, result_path in db.execute(
+                "SELECT id, label, bbox, result_path FROM tasks WHERE city = ?", (city['slug'],))
+                if previous != (query_mode, geometry) or (label, bbox) not in planned]
+            db.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id, _ in stale])
+
+            db.execute("INSERT INTO cities (slug, query_mode, geometry) VALUES (?, ?, ?) "
+                       "ON CONFLICT (slug) DO UPDATE SET query_mode = excluded.query_mode, "
+                       "geometry = excluded.geometry, assembled_at = NULL",
+                       (city['slug'], query_mode, geometry))
+            added = 0
+            for label, bbox in sorted(planned):
+                cursor = db.execute("INSERT OR IGNORE INTO tasks (city, label, bbox, updated_at) VALUES (?, ?, ?, ?)",
+                                    (city['slug'], label, bbox, time.time()))
+                added += cursor.rowcount
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+        for _, result_path in stale:
+            if result_path and os.path.exists(result_path):
+                os.remove(result_path)
+        return added, len(stale)
+
+    def lease(self, owner):
+        """Lease the next runnable task to owner, or return None when there is none"""
+        now = time.time()
+        db = self.transaction()
+        try:
+            # Tasks whose workers kept dying are not handed out forever
+            db.execute("UPDATE tasks SET status = 'failed', error = 'Lease expired', lease_owner = NULL, "
+                       "lease_expires = NULL, updated_at = ? WHERE status = 'leased' AND lease_expires < ? "
+                       "AND attempts >= ?", (now, now, self.max_attempts))
+            row = db.execute(
+                "SELECT t.id, t.city, t.label, t.bbox, t.attempts, c.query_mode, c.geometry "
+                "FROM tasks t JOIN cities c ON c.slug = t.city "
+                "WHERE t.status = 'pending' OR (t.status = 'leased' AND t.lease_expires < ?) "
+                "ORDER BY t.attempts, t.id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute("UPDATE tasks SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                       "lease_expires = ?, updated_at = ? WHERE id = ?",
+                       (owner, now + self.lease_seconds, now, row[0]))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        task_id, city, label, bbox, attempts, query_mode, geometry = row
+        return Task(task_id, city, label, parse_task_bbox(bbox), attempts + 1, query_mode, geometry)
+
+    def complete(self, task, owner, result_path, result_count):
+        """Mark a leased task as done; ignored if the lease was lost to another worker"""
+        cursor = self.db.execute(
+            "UPDATE tasks SET status = 'done', result_path = ?, result_count = ?, error = NULL, "
+            "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (result_path, result_count, time.time(), task.id, owner))
+        return cursor.rowcount == 1
+
+    def renew(self, task, owner):
+        """Extend the lease of a running task; False if the lease was lost to another worker"""
+        cursor = self.db.execute(
+            "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (time.time() + self.lease_seconds, time.time(), task.id, owner))
+        return cursor.rowcount == 1
+
+    def fail(self, task, owner, error):
+        """Return a failed task to the queue, or mark it failed after max_attempts"""
+        status = 'failed' if task.attempts >= self.max_attempts else 'pending'
+        self.db.execute(
+            "UPDATE tasks SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (status, error, time.time(), task.id, owner))
+        return status
+
+    def reclaim_leases(self):
+        """Return every leased task to the queue, e.g. after a crash when no worker is running"""
+        return self.db.execute("UPDATE tasks SET status = 'pending', lease_owner = NULL, lease_expires = NULL "
+                               "WHERE status = 'leased'").rowcount
+
+    def retry_failed(self):
+        """Give failed tasks another max_attempts attempts"""
+        return self.db.execute("UPDATE tasks SET status = 'pending', attempts = 0 WHERE status = 'failed'").rowcount
+
+    def progress(self):
+        """{city slug: {status: task count}}"""
+        progress = {}
+        for city, status, count in self.db.execute("SELECT city, status, COUNT(*) FROM tasks GROUP BY city, status"):
+            progress.setdefault(city, {})[status] = count
+        return progress
+
+    def claim_assembly(self, city_slug):
+        """
+        True exactly once per enqueue for a city whose tasks are all done, so only one
+        worker writes the city's output files
+        """
+        db = self.transaction()
+        try:
+            unfinished = db.execute("SELECT COUNT(*) FROM tasks WHERE city = ? AND status != 'done'",
+                                    (city_slug,)).fetchone()[0]
+            claimed = not unfinished and db.execute(
+                "UPDATE cities SET assembled_at = ? WHERE slug = ? AND assembled_at IS NULL",
+                (time.time(), city_slug)).rowcount == 1
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return claimed
+
+    def results(self, city_slug):
+        """(label, result path) of every finished task of a city"""
+        return self.db.execute("SELECT label, result_path FROM tasks WHERE city = ? AND status = 'done' ORDER BY id",
+                               (city_slug,)).fetchall()
+
+
+class LeaseHeartbeat:
+    """
+    Keeps renewing the lease of a task while it runs, on a background thread with its own
+    database connection, so a task that takes longer than the lease time is not handed to
+    a second worker; the lease still expires soon after the worker dies
+
+        with LeaseHeartbeat(queue, task, owner):
+            run_task(task, ...)
+    """
+
+    def __init__(self, queue, task, owner):
+        self.queue_path = queue.path
+        self.lease_seconds = queue.lease_seconds
+        self.task = task
+        self.owner = owner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{task.id}", daemon=True)
+
+    def _run(self):
+        queue = JobQueue(self.queue_path, self.lease_seconds)
+        try:
+            while not self._stop.wait(self.lease_seconds * LEASE_RENEW_SHARE):
+                try:
+                    renewed = queue.renew(self.task, self.owner)
+                except sqlite3.OperationalError as e:
+                    # Database busy; the next beat comes well before the lease expires
+                    print(f"⚠️ [{self.owner}] Could not renew the lease of task {self.task.id}: {str(e)}")
+                    continue
+                if not renewed:
+                    print(f"⚠️ [{self.owner}] Lost the lease of task {self.task.id}")
+                    return
+        finally:
+            queue.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_task(task, city, results_dir=DEFAULT_RESULTS_DIR, **collect_options):
+    """
+    Collect one task and write its records to a result archive
+    Returns (result path, record count); raises when the query group failed
+    """
+    # The task bbox is fetched as a single tile, which is split if the server times out
+    south, west, north, east = task.bbox
+    errors = {}
+    # Records go straight into the result archive; none are held in memory
+    result_path = os.path.join(results_dir, city['slug'], task.label, f"{task.id}.ndjson.gz")
+    with RawArchiveWriter(result_path) as archive:
+        collect_city(dict(city, bbox=task.bbox), query_mode=task.query_mode, geometry=task.geometry,
+                     tile_size=max(north - south, east - west), labels=[task.label], errors=errors,
+                     archive=archive, keep_records=False, **collect_options)
+        if task.label in errors:
+            raise RuntimeError(errors[task.label])
+    return result_path, archive.count
+
+
+def assemble_city(queue, city, data_dir=DATA_DIR, formats=DEFAULT_FORMATS):
+    """Merge the result archives of a finished city and write its output files"""
+    query_mode = queue.db.execute("SELECT query_mode FROM cities WHERE slug = ?", (city['slug'],)).fetchone()[0]
+    # Elements on tile edges are returned by both tiles; one dict across all archives keeps the last copy
+    keys = ('element_type', 'osm_id') if query_mode == 'merged' else ('element_type', 'osm_id', 'category')
+    merged = {}
+    for _, result_path in queue.results(city['slug']):
+        for record in iter_raw_archive(result_path):
+            merged[tuple(record[k] for k in keys)] = record
+    records = list(merged.values())
+    save_city_data(city, records, data_dir, formats)
+    return len(records)
+
+
+def run_worker(queue_path, cities, data_dir=DATA_DIR, results_dir=DEFAULT_RESULTS_DIR, formats=DEFAULT_FORMATS,
+               lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS, cache_dir=DEFAULT_CACHE_DIR,
+               tile_workers=DEFAULT_TILE_WORKERS):
+    """
+    Lease and run tasks until the queue is drained, then write the output of every
+    city whose tasks are all done. Returns the number of tasks this worker finished
+    """
+    queue = JobQueue(queue_path, lease_seconds, max_attempts)
+    owner = worker_name()
+    cities_by_slug = {city['slug']: city for city in cities}
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    scheduler = RequestScheduler()
+    finished = 0
+
+    try:
+        while True:
+            task = queue.lease(owner)
+            if task is None:
+                break
+            city = cities_by_slug.get(task.city)
+            if city is None:
+                queue.fail(task, owner, "City is not in the city table")
+                continue
+
+            label = f"{city['name']}/{task.label} {describe_tile(task.bbox)}"
+            print(f"🧱 [{owner}] Task {task.id} {label}, attempt {task.attempts}")
+            try:
+                with LeaseHeartbeat(queue, task, owner):
+                    result_path, count = run_task(task, city, results_dir, cache=cache, scheduler=scheduler,
+                                                  tile_workers=tile_workers)
+            except Exception as e:
+                status = queue.fail(task, owner, str(e))
+                print(f"❌ [{owner}] Task {task.id} {label} failed ({status}): {str(e)}")
+                continue
+            if queue.complete(task, owner, result_path, count):
+                finished += 1
+
+        for slug, city in cities_by_slug.items():
+            if queue.claim_assembly(slug):
+                count = assemble_city(queue, city, data_dir, formats)
+                print(f"📦 [{city['name']}] Assembled {count} entries from finished tasks")
+    finally:
+        queue.close()
+    return finished
+
+
+def print_progress(queue):
+    for city, statuses in sorted(queue.progress().items()):
+        summary = ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items()))
+        print(f"   - {city}: {summary}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable OSM collection: enqueue tasks, run workers, show progress")
+    parser.add_argument("command", choices=["enqueue", "work", "status"])
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_FILE, help="SQLite file of the job queue")
+    parser.add_argument("--cities", nargs="+", help="City names (default: every city in the table)")
+    parser.add_argument("--city-table", default=CITY_TABLE, help="CSV file with the city definitions")
+    parser.add_argument("--query-mode", choices=["category", "merged"], default="category",
+                        help="enqueue: one task per category, or one merged task per tile")
+    parser.add_argument("--geometry", choices=sorted(GEOMETRY_OUTPUTS), default="recurse",
+                        help="enqueue: how way/relation coordinates are obtained")
+    parser.add_argument("--tile-size", type=float, default=None,
+                        help="enqueue: one task per grid tile of this many degrees instead of per city")
+    parser.add_argument("--processes", type=int, default=1, help="work: number of worker processes to start")
+    parser.add_argument("--tile-workers", type=int, default=DEFAULT_TILE_WORKERS,
+                        help="work: parallel fetches of split tiles within a task")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="work: seconds without a lease renewal before a task is handed to another worker")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, help="work: attempts per task")
+    parser.add_argument("--reclaim-leases", action="store_true",
+                        help="work: requeue leased tasks right away (only when no other worker is running)")
+    parser.add_argument("--retry-failed", action="store_true", help="work: requeue tasks that ran out of attempts")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="work: output directory for the assembled data")
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR, help="work: directory of the per-task results")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="work: directory of the Overpass response cache")
+    parser.add_argument("--formats", nargs="+", choices=OUTPUT_FORMATS, default=list(DEFAULT_FORMATS),
+                        help="work: output formats of the assembled cities")
+    args = parser.parse_args()
+
+    cities = load_cities(args.city_table, names=args.cities)
+    queue = JobQueue(args.queue, args.lease_seconds, args.max_attempts)
+
+    if args.command == "enqueue":
+        for city in cities:
+            added, removed = queue.enqueue_city(city, args.query_mode, args.geometry, args.tile_size)
+            print(f"🗂️ [{city['name']}] {added} new tasks" + (f", {removed} outdated tasks removed" if removed else ""))
+    elif args.command == "work":
+        if args.reclaim_leases:
+            print(f"♻️ Requeued {queue.reclaim_leases()} leased tasks")
+        if args.retry_failed:
+            print(f"♻️ Requeued {queue.retry_failed()} failed tasks")
+        queue.close()
+
+        worker_args = (args.queue, cities, args.data_dir, args.results_dir, args.formats,
+                       args.lease_seconds, args.max_attempts, args.cache_dir, args.tile_workers)
+        if args.processes == 1:
+            run_worker(*worker_args)
+        else:
+            processes = [multiprocessing.Process(target=run_worker, args=worker_args) for _ in range(args.processes)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+        queue = JobQueue(args.queue)
+
+    print("📋 Queue status:")
+    print_progress(queue)
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Script-based language detection for OSM place names and descriptions
+# Each text is reduced to a histogram of script classes in one str.translate pass,
+# and results are memoized because the same names (chain brands, "Jamia Masjid", ...)
+# repeat thousands of times across cities.
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Script classes, each marked by a control character after translation
+ARABIC, LATIN, TIBETAN, PASHTO, URDU, SHINA = '\x01', '\x02', '\x03', '\x04', '\x05', '\x06'
+
+# Letters only used by one of the Perso-Arabic orthographies of the region
+PASHTO_LETTERS = 'ټځڅډړږښګڼېۍ'
+URDU_LETTERS = 'ٹڈڑںےھ'
+# Shina orthography adds letters from the Arabic Supplement block
+SHINA_LETTERS = 'ڙݜݨݭݰ'
+
+ARABIC_RANGES = [(0x0600, 0x06FF), (0x0750, 0x077F), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)]
+LATIN_RANGES = [(0x41, 0x5A), (0x61, 0x7A), (0xC0, 0x24F)]
+TIBETAN_RANGES = [(0x0F00, 0x0FFF)]
+
+LANGUAGE_CACHE_SIZE = 1 << 16
+
+_LETTER = re.compile(r'[^\W\d_]')
+
+
+def build_class_table():
+    """str.translate table mapping every letter of a known script to its class marker"""
+    table = {code: None for code in range(0x20)}
+    for ranges, marker in ((ARABIC_RANGES, ARABIC), (LATIN_RANGES, LATIN), (TIBETAN_RANGES, TIBETAN)):
+        for start, end in ranges:
+            for code in range(start, end + 1):
+                # Digits, punctuation and vowel marks of a block do not count as letters
+                if chr(code).isalpha():
+                    table[code] = marker
+    for letters, marker in ((PASHTO_LETTERS, PASHTO), (URDU_LETTERS, URDU), (SHINA_LETTERS, SHINA)):
+        for letter in letters:
+            table[ord(letter)] = marker
+    return table
+
+
+_CLASS_TABLE = build_class_table()
+
+
+def label_language(arabic_ratio, latin_ratio, tibetan_ratio, pashto, urdu, shina):
+    """
+    Language label from the script ratios of a text and its counts of Pashto-, Urdu- and
+    Shina-only letters
+
+    Balti is recognised by Tibetan script, Shina and Pashto by their own letters; Balti or
+    Shina written without those letters cannot be told apart from Urdu by script alone
+    """
+    if tibetan_ratio > 0.3:
+        return 'Balti'
+    if arabic_ratio > 0.3:
+        if shina:
+            return 'Shina'
+        if pashto > urdu:
+            return 'Pashto'
+        return 'Urdu'
+    if latin_ratio > 0.7:
+        return 'English'
+    return 'Mixed'
+
+
+@lru_cache(maxsize=LANGUAGE_CACHE_SIZE)
+def classify_text(text):
+    """
+    (language, arabic_ratio, latin_ratio, tibetan_ratio) of a text, where the ratios are
+    shares of all its letters; texts without letters are 'unknown'
+    """
+    if not text:
+        return 'unknown', 0.0, 0.0, 0.0
+    letters = len(_LETTER.findall(text))
+    if not letters:
+        return 'unknown', 0.0, 0.0, 0.0
+
+    classes = text.translate(_CLASS_TABLE)
+    pashto, urdu, shina = classes.count(PASHTO), classes.count(URDU), classes.count(SHINA)
+    # Letters of other scripts only count towards the total
+    arabic_ratio = (classes.count(ARABIC) + pashto + urdu + shina) / letters
+    latin_ratio = classes.count(LATIN) / letters
+    tibetan_ratio = classes.count(TIBETAN) / letters
+
+    language = label_language(arabic_ratio, latin_ratio, tibetan_ratio, pashto, urdu, shina)
+    return language, arabic_ratio, latin_ratio, tibetan_ratio
+
+
+def detect_language(text):
+    """Language label of a single text (memoized)"""
+    return classify_text(text)[0]
+
+
+def detect_languages(texts):
+    """
+    Classify a whole column of texts at once
+
+    Each distinct text is classified once; returns a DataFrame aligned with texts with
+    the columns language, arabic_ratio, latin_ratio and tibetan_ratio
+    """
+    texts = pd.Series(texts, dtype=object)
+    codes, uniques = pd.factorize(texts.fillna(''), sort=False)
+    classified = [classify_text(text) for text in uniques]
+
+    columns = list(zip(*classified)) if classified else [(), (), (), ()]
+    language = np.array(columns[0], dtype=object)[codes]
+    ratios = [np.array(column, dtype=float)[codes] for column in columns[1:]]
+    return pd.DataFrame({
+        'language': language,
+        'arabic_ratio': ratios[0],
+        'latin_ratio': ratios[1],
+        'tibetan_ratio': ratios[2],
+    }, index=texts.index)
@@ -0,0 +1,120 @@
+# Loader and migrator for the legacy OSM CSV files
+# Older <city>_osm_data.csv and osm_<city>_cleaned.csv files store coordinates as
+# "[Decimal('lon'), Decimal('lat')]" and all_tags as Python dict reprs. Both are parsed
+# for a whole column at once with regular expressions instead of ast.literal_eval per row,
+# and the migrator rewrites every file into the typed Parquet dataset in one pass.
+import os
+import re
+import ast
+import glob
+import argparse
+import pandas as pd
+from osm_collector import DATA_DIR
+from osm_columnar import frame_to_table, write_city_table, DEFAULT_DATASET_DIR
+from osm_vocab import TagVocabulary, DEFAULT_VOCAB_FILE
+from osm_language import detect_languages
+
+TEXT_COLUMNS = ['description', 'name', 'name_en', 'name_ur']
+
+# "[Decimal('71.4765492'), Decimal('29.2612150')]" or "[71.4765492, 29.261215]"
+_COORDINATES = r"\[\s*(?:Decimal\(')?(-?[\d.]+)'?\)?\s*,\s*(?:Decimal\(')?(-?[\d.]+)'?\)?\s*\]"
+# One 'key': 'value' item of a dict repr; repr() switches to double quotes for strings with a '
+_STRING = r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*\""""
+_TAG_ITEM = re.compile(f"({_STRING}):\\s*({_STRING})")
+
+_LEGACY_FILE = re.compile(r'^(?:osm_(?P<cleaned>.+)_cleaned|(?P<raw>.+)_osm_data)\.csv$')
+
+
+def unquote(token):
+    """Value of a Python string literal token; only escaped tokens need the full parser"""
+    if '\\' in token:
+        return ast.literal_eval(token)
+    return token[1:-1]
+
+
+def parse_tag_reprs(series):
+    """
+    Parse a column of Python dict reprs of OSM tags into dicts
+    The regex runs over each string in C; missing values become empty dicts
+    """
+    items = series.fillna('').astype(str).str.findall(_TAG_ITEM)
+    return pd.Series([{unquote(k): unquote(v) for k, v in pairs} for pairs in items], index=series.index, dtype=object)
+
+
+def parse_coordinates(series):
+    """Parse a column of [lon, lat] reprs into a DataFrame of float longitude/latitude"""
+    parts = series.astype(str).str.extract(_COORDINATES)
+    return pd.DataFrame({
+        'longitude': pd.to_numeric(parts[0], errors='coerce'),
+        'latitude': pd.to_numeric(parts[1], errors='coerce'),
+    }, index=series.index)
+
+
+def load_legacy_csv(path):
+    """
+    Load a legacy OSM CSV with typed columns: float coordinates (taken from the coordinates
+    repr where latitude/longitude are missing), all_tags as dicts and '' for missing text.
+    The language is re-detected for the whole column, since older files were labelled by a
+    detector that only knew Urdu, English and Mixed
+    """
+    df = pd.read_csv(path, encoding='utf-8', dtype={'osm_tag_value': str, 'name': str, 'name_en': str, 'name_ur': str})
+    for column in TEXT_COLUMNS:
+        df[column] = df[column].fillna('')
+
+    coordinates = parse_coordinates(df['coordinates'])
+    for column in ('latitude', 'longitude'):
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(coordinates[column])
+    df = df.drop(columns=['coordinates'])
+
+    df['all_tags'] = parse_tag_reprs(df['all_tags'])
+    df['language'] = detect_languages(df['description'])['language']
+    return df
+
+
+def legacy_files(data_dir=DATA_DIR):
+    """
+    {city slug: path} of the legacy CSV files in data_dir; a city's cleaned file is
+    preferred over its raw collection output
+    """
+    files = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, '*.csv'))):
+        match = _LEGACY_FILE.match(os.path.basename(path))
+        if not match:
+            continue
+        if match.group('cleaned'):
+            files[match.group('cleaned')] = path
+        else:
+            files.setdefault(match.group('raw'), path)
+    return files
+
+
+def migrate_legacy(data_dir=DATA_DIR, dataset_dir=DEFAULT_DATASET_DIR, vocab_path=DEFAULT_VOCAB_FILE):
+    """
+    Rewrite every legacy CSV file into the city's partitions of the Parquet dataset,
+    with tag ids from the shared vocabulary
+    """
+    migrated = {}
+    vocabulary = TagVocabulary(vocab_path)
+    try:
+        for slug, path in legacy_files(data_dir).items():
+            df = load_legacy_csv(path)
+            write_city_table(frame_to_table(df, slug, vocabulary), slug, dataset_dir)
+            migrated[slug] = len(df)
+            print(f"🔄 [{slug}] Migrated {len(df)} rows from {os.path.basename(path)}")
+    finally:
+        vocabulary.close()
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate the legacy OSM CSV files into the Parquet dataset")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory with the legacy CSV files")
+    parser.add_argument("--dataset-dir", default=DEFAULT_DATASET_DIR, help="Output directory of the Parquet dataset")
+    args = parser.parse_args()
+
+    migrated = migrate_legacy(args.data_dir, args.dataset_dir)
+    print(f"✅ Migrated {sum(migrated.values())} rows of {len(migrated)} cities into {args.dataset_dir}")
+
+
+if __name__ == "__main__":
+    main()
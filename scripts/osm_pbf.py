@@ -0,0 +1,164 @@
+# Offline OSM collection from a local .osm.pbf extract
+# Reads a country extract (e.g. pakistan-latest.osm.pbf) in a single streaming pass and
+# routes every matching element to the cities whose bounding box contains it, producing
+# the same records as the Overpass collector without any network requests.
+import os
+import argparse
+import time
+from datetime import datetime
+from osm_collector import (DATA_DIR, CITY_TABLE, CATEGORY_FILTERS, OUTPUT_FORMATS, DEFAULT_FORMATS,
+                           load_cities, priority_tags_for, assign_categories, process_osm_element,
+                           element_parts, element_coordinates, save_city_data)
+from overpass_stream import StreamElement
+
+try:
+    import osmium
+except ImportError:
+    osmium = None
+
+
+def require_osmium():
+    if osmium is None:
+        raise ImportError("PBF ingestion needs pyosmium: pip install osmium")
+
+
+def filter_keys(cities):
+    """Tag keys of every category collected for any of the cities"""
+    keys = []
+    for city in cities:
+        for category in city['categories']:
+            for key, _ in CATEGORY_FILTERS[category]:
+                if key not in keys:
+                    keys.append(key)
+    return keys
+
+
+def cities_at(cities, lat, lon):
+    """Cities whose (south, west, north, east) bounding box contains the point"""
+    return [city for city in cities
+            if city['bbox'][0] <= lat <= city['bbox'][2] and city['bbox'][1] <= lon <= city['bbox'][3]]
+
+
+def ring_geometry(nodes):
+    """Overpass-style geometry ({'lat', 'lon'} points) of a node list, skipping nodes missing from the extract"""
+    return [{'lat': n.lat, 'lon': n.lon} for n in nodes if n.location.valid()]
+
+
+def pbf_element(obj):
+    """
+    Convert a pyosmium object into (element_type, StreamElement), or None when it has no
+    usable location. Ways keep their node locations and multipolygons their assembled outer
+    rings as inline geometry, as 'out geom' results do, so both get parts and a centroid
+    """
+    data = {'tags': {tag.k: tag.v for tag in obj.tags}, 'version': obj.version}
+
+    if obj.is_node():
+        if not obj.location.valid():
+            return None
+        data.update(id=obj.id, lat=obj.location.lat, lon=obj.location.lon)
+        return 'node', StreamElement(data)
+
+    if obj.is_way():
+        geometry = ring_geometry(obj.nodes)
+        if not geometry:
+            return None
+        data.update(id=obj.id, geometry=geometry)
+        return 'way', StreamElement(data)
+
+    # Areas are only handled for relations; closed ways already arrive as ways
+    members = [{'type': 'way', 'role': 'outer', 'geometry': geometry}
+               for geometry in map(ring_geometry, obj.outer_rings()) if geometry]
+    if not members:
+        return None
+    data.update(id=obj.orig_id(), members=members)
+    return 'relation', StreamElement(data)
+
+
+def iter_pbf_objects(path, keys):
+    """
+    Stream the nodes, ways and multipolygon relations of a PBF file that carry one of the keys
+
+    libosmium decodes the PBF blocks on its own thread pool while Python consumes the
+    objects; the key filter runs in C++ so untagged nodes never reach Python.
+    Node locations are cached for the way geometries, and relations are assembled into areas
+    """
+    require_osmium()
+    processor = (osmium.FileProcessor(path)
+                 .with_locations()
+                 .with_areas(osmium.filter.KeyFilter(*keys))
+                 .with_filter(osmium.filter.KeyFilter(*keys)))
+    for obj in processor:
+        # Relations are used through their assembled areas
+        if obj.is_relation() or (obj.is_area() and obj.from_way()):
+            continue
+        yield obj
+
+
+def collect_pbf(path, cities, query_mode='category'):
+    """
+    Collect every city from a local PBF extract in one pass
+    Returns {city slug: records}, with one record per matching category (query_mode='category')
+    or one record with all matching categories (query_mode='merged'), as collect_city does
+    """
+    if query_mode not in ('category', 'merged'):
+        raise ValueError(f"Unknown query mode: {query_mode}")
+
+    priority_tags = {city['slug']: priority_tags_for(city['categories']) for city in cities}
+    collected = {city['slug']: [] for city in cities}
+
+    print(f"📦 Reading {path} for {len(cities)} cities...")
+    start = time.time()
+    scanned = 0
+    collected_at = datetime.now().isoformat()
+    for obj in iter_pbf_objects(path, filter_keys(cities)):
+        scanned += 1
+        converted = pbf_element(obj)
+        if converted is None:
+            continue
+        element_type, element = converted
+        lat, lon = element_coordinates(element, element_type, element_parts(element, element_type))
+        if lat is None:
+            continue
+
+        for city in cities_at(cities, lat, lon):
+            matched = assign_categories(element.tags, city['categories'])
+            if not matched:
+                continue
+            groups = [city['categories']] if query_mode == 'merged' else matched
+            for category in groups:
+                data_entry = process_osm_element(element, element_type, category, city['name'],
+                                                 priority_tags[city['slug']], collected_at)
+                if data_entry:
+                    collected[city['slug']].append(data_entry)
+
+    print(f"✅ Scanned {scanned} tagged elements in {time.time() - start:.1f}s")
+    return collected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect OSM place descriptions for the cities in the city table "
+                                                 "from a local .osm.pbf extract")
+    parser.add_argument("pbf", help="Path of the .osm.pbf extract covering the cities")
+    parser.add_argument("--cities", nargs="+", help="City names to collect (default: every city in the table)")
+    parser.add_argument("--city-table", default=CITY_TABLE, help="CSV file with the city definitions")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Output directory for the collected data")
+    parser.add_argument("--query-mode", choices=["category", "merged"], default="category",
+                        help="One record per matching category, or one record with all matching categories")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads libosmium uses to decode PBF blocks (default: one per core)")
+    parser.add_argument("--formats", nargs="+", choices=OUTPUT_FORMATS, default=list(DEFAULT_FORMATS),
+                        help="Output formats, as for osm_collector.py")
+    args = parser.parse_args()
+
+    if args.threads:
+        # Read by libosmium when its thread pool is first created
+        os.environ['OSMIUM_POOL_THREADS'] = str(args.threads)
+
+    cities = load_cities(args.city_table, names=args.cities)
+    collected = collect_pbf(args.pbf, cities, args.query_mode)
+    for city in cities:
+        save_city_data(city, collected[city['slug']], args.data_dir, args.formats)
+
+
+if __name__ == "__main__":
+    main()
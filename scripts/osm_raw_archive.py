@@ -0,0 +1,134 @@
+# Compressed NDJSON archive of raw collected OSM records
+# One JSON object per line, gzip-compressed at a fast level, written and read as a stream
+# so neither side ever holds a second copy of the whole dataset in memory.
+import os
+import gzip
+import json
+import decimal
+import numpy as np
+from osm_records import OSMRecord
+
+# gzip level 1 compresses OSM text several times over at close to disk speed
+COMPRESS_LEVEL = 1
+
+
+class DecimalEncoder(json.JSONEncoder):
+    """
+    JSON encoder that writes the Decimal coordinates from overpy as plain numbers,
+    OSMRecords as dicts and geometry point arrays as nested lists
+    """
+
+    def default(self, o):
+        if isinstance(o, decimal.Decimal):
+            return float(o)
+        if isinstance(o, OSMRecord):
+            return o.to_dict()
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        return super().default(o)
+
+
+def raw_archive_path(data_dir, city_slug):
+    return os.path.join(data_dir, f"{city_slug}_osm_raw.ndjson.gz")
+
+
+def open_archive(path, mode='rt', compressed=None):
+    """Open an archive as text; compressed defaults to whether the path ends in .gz"""
+    if compressed is None:
+        compressed = path.endswith('.gz')
+    if not compressed:
+        return open(path, mode, encoding='utf-8')
+    if 'w' in mode:
+        return gzip.open(path, mode, encoding='utf-8', compresslevel=COMPRESS_LEVEL)
+    return gzip.open(path, mode, encoding='utf-8')
+
+
+class RawArchiveWriter:
+    """
+    Writes records one line at a time to a temporary file that replaces the archive
+    on close(), so an interrupted run never leaves a truncated archive behind
+
+        with RawArchiveWriter(path) as writer:
+            for record in records:
+                writer.write(record)
+
+    mark() sets a savepoint and rollback() drops the records written since the last one,
+    so a collector can stream a query group and still discard it when the group fails.
+    Each savepoint ends a gzip member; readers see the members as one stream
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.compressed = path.endswith('.gz')
+        self.count = 0
+        self._encoder = DecimalEncoder(ensure_ascii=False, separators=(',', ':'))
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._raw = open(self.tmp_path, 'wb')
+        self._member = None
+        self._mark = (0, 0)
+
+    @property
+    def closed(self):
+        return self._raw.closed
+
+    def write(self, record):
+        if self._member is None:
+            self._member = (gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=COMPRESS_LEVEL)
+                            if self.compressed else self._raw)
+        self._member.write(self._encoder.encode(record).encode('utf-8'))
+        self._member.write(b'\n')
+        self.count += 1
+
+    def _end_member(self):
+        # Closing a GzipFile writes its trailer but leaves the underlying file open
+        if self._member is not None and self._member is not self._raw:
+            self._member.close()
+        self._member = None
+
+    def mark(self):
+        """Keep everything written so far, whatever happens to later records"""
+        self._end_member()
+        self._mark = (self._raw.tell(), self.count)
+
+    def rollback(self):
+        """Drop the records written since the last mark()"""
+        self._end_member()
+        offset, self.count = self._mark
+        self._raw.seek(offset)
+        self._raw.truncate()
+
+    def close(self):
+        self._end_member()
+        self._raw.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._end_member()
+        self._raw.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_raw_archive(path, records):
+    """Stream records into a compressed NDJSON archive, returning the number written"""
+    with RawArchiveWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
+
+
+def iter_raw_archive(path):
+    """Yield the records of an NDJSON archive one at a time"""
+    with open_archive(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
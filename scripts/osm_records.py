@@ -0,0 +1,87 @@
+# Compact record type for collected OSM elements
+# One slotted object per element instead of a 17-key dict: the constant source is a class
+# attribute, city names and labels are interned, a collection run shares one timestamp
+# string, the element's tag dict is referenced rather than copied, and the [lon, lat]
+# coordinates list is derived on demand from the float coordinates. Way and relation records also keep their point
+# arrays ('parts') for the geometry stage.
+import sys
+import pandas as pd
+
+# Column order of the CSV output and of to_dict()
+FIELDS = ('osm_id', 'element_type', 'category', 'description', 'name', 'name_en', 'name_ur',
+          'language', 'location', 'osm_tag_key', 'osm_tag_value', 'source', 'coordinates',
+          'latitude', 'longitude', 'all_tags', 'version', 'collected_at')
+
+# Joins the categories of an element matched by several categories in merged query mode
+CATEGORY_SEPARATOR = ';'
+
+# Kept on records and in the raw archive, but not a CSV column
+EXTRA_FIELDS = ('parts',)
+_KEYS = frozenset(FIELDS + EXTRA_FIELDS)
+
+
+class OSMRecord:
+    """
+    A collected OSM element; supports record['field'] and record.get('field') so code
+    written for the former dict records keeps working
+    """
+    __slots__ = ('osm_id', 'element_type', 'category', 'description', 'name', 'name_en', 'name_ur',
+                 'language', 'location', 'osm_tag_key', 'osm_tag_value', 'latitude', 'longitude',
+                 'all_tags', 'version', 'collected_at', 'parts')
+
+    source = 'OSM'
+
+    def __init__(self, osm_id, element_type, category, description, name, name_en, name_ur, language,
+                 location, osm_tag_key, osm_tag_value, latitude, longitude, all_tags, version, collected_at,
+                 parts=None):
+        self.osm_id = osm_id
+        self.element_type = sys.intern(element_type)
+        self.category = sys.intern(category)
+        self.description = description
+        self.name = name
+        self.name_en = name_en
+        self.name_ur = name_ur
+        # None until save_city_data labels the collected records in one batch
+        self.language = sys.intern(language) if language is not None else None
+        self.location = sys.intern(location)
+        self.osm_tag_key = sys.intern(osm_tag_key)
+        self.osm_tag_value = sys.intern(osm_tag_value)
+        # overpy gives Decimal node coordinates; stored as float so every element type writes the same format
+        self.latitude = float(latitude) if latitude is not None else None
+        self.longitude = float(longitude) if longitude is not None else None
+        self.all_tags = all_tags
+        self.version = version
+        self.collected_at = collected_at
+        self.parts = parts
+
+    @property
+    def coordinates(self):
+        if self.latitude and self.longitude:
+            return [self.longitude, self.latitude]
+        return None
+
+    def __getitem__(self, key):
+        if key not in _KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in _KEYS else default
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in FIELDS}
+        if self.parts is not None:
+            data['parts'] = self.parts
+        return data
+
+    def __repr__(self):
+        return f"OSMRecord({self.element_type}/{self.osm_id}, {self.category!r}, {self.name!r})"
+
+
+def records_frame(records):
+    """
+    Build the DataFrame of collected records column by column, without an intermediate
+    list of dicts; records may mix OSMRecord objects and dicts loaded from older output
+    """
+    return pd.DataFrame({field: [record.get(field) for record in records] for field in FIELDS},
+                        columns=list(FIELDS))
@@ -0,0 +1,216 @@
+# Embedded SQLite store of collected OSM places
+# One row per element keyed by (element_type, osm_id), an R-tree over the coordinates
+# kept in sync by triggers, and indexes on tags, language and city, so radius and tag
+# queries read a handful of index pages instead of re-reading whole CSV files.
+import os
+import json
+import math
+import sqlite3
+import argparse
+from osm_raw_archive import DecimalEncoder
+from osm_records import CATEGORY_SEPARATOR
+from osm_geometry import METERS_PER_DEGREE, haversine_m
+
+DEFAULT_STORE_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "osm_places.sqlite"))
+
+COLUMNS = ('element_type', 'osm_id', 'category', 'description', 'name', 'name_en', 'name_ur', 'language',
+           'location', 'osm_tag_key', 'osm_tag_value', 'source', 'latitude', 'longitude', 'all_tags',
+           'version', 'collected_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    element_type TEXT NOT NULL,
+    osm_id INTEGER NOT NULL,
+    category TEXT,
+    description TEXT,
+    name TEXT,
+    name_en TEXT,
+    name_ur TEXT,
+    language TEXT,
+    location TEXT,
+    osm_tag_key TEXT,
+    osm_tag_value TEXT,
+    source TEXT,
+    latitude REAL,
+    longitude REAL,
+    all_tags TEXT,
+    version INTEGER,
+    collected_at TEXT,
+    PRIMARY KEY (element_type, osm_id)
+);
+CREATE INDEX IF NOT EXISTS places_tag ON places (osm_tag_key, osm_tag_value);
+CREATE INDEX IF NOT EXISTS places_language ON places (language);
+CREATE INDEX IF NOT EXISTS places_location ON places (location);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS places_rtree USING rtree (id, min_lat, max_lat, min_lon, max_lon);
+
+CREATE TRIGGER IF NOT EXISTS places_rtree_insert AFTER INSERT ON places
+WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+    INSERT INTO places_rtree VALUES (new.rowid, new.latitude, new.latitude, new.longitude, new.longitude);
+END;
+CREATE TRIGGER IF NOT EXISTS places_rtree_update AFTER UPDATE OF latitude, longitude ON places BEGIN
+    DELETE FROM places_rtree WHERE id = old.rowid;
+    INSERT INTO places_rtree SELECT new.rowid, new.latitude, new.latitude, new.longitude, new.longitude
+    WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+END;
+CREATE TRIGGER IF NOT EXISTS places_rtree_delete AFTER DELETE ON places BEGIN
+    DELETE FROM places_rtree WHERE id = old.rowid;
+END;
+"""
+
+UPSERT = (f"INSERT INTO places ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+          "ON CONFLICT (element_type, osm_id) DO UPDATE SET "
+          + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[2:]))
+
+
+def to_float(value):
+    return float(value) if value is not None else None
+
+
+def merge_categories(records):
+    """
+    One row per (element_type, osm_id): elements collected once per category are merged
+    into a single row with all their categories
+    """
+    merged = {}
+    for record in records:
+        key = (record['element_type'], record['osm_id'])
+        if key not in merged:
+            merged[key] = (record, record['category'].split(CATEGORY_SEPARATOR))
+            continue
+        categories = merged[key][1]
+        for category in record['category'].split(CATEGORY_SEPARATOR):
+            if category not in categories:
+                categories.append(category)
+    return [(record, CATEGORY_SEPARATOR.join(categories)) for record, categories in merged.values()]
+
+
+class PlaceStore:
+    """
+    SQLite store of collected places; records are the OSMRecords or dicts produced by
+    process_osm_element, all_tags is stored as JSON
+    """
+
+    def __init__(self, path=DEFAULT_STORE_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def row_values(self, record, category):
+        values = []
+        for column in COLUMNS:
+            if column == 'category':
+                value = category
+            elif column in ('latitude', 'longitude'):
+                value = to_float(record.get(column))
+            elif column == 'all_tags':
+                value = json.dumps(record.get(column) or {}, ensure_ascii=False, cls=DecimalEncoder)
+            else:
+                value = record.get(column)
+            values.append(value)
+        return values
+
+    def upsert(self, records):
+        """Insert records, replacing the stored rows of elements that already exist"""
+        with self.db:
+            self.db.executemany(UPSERT, (self.row_values(record, category)
+                                         for record, category in merge_categories(records)))
+
+    def replace_city(self, city_name, records):
+        """Replace every stored place of a city with the given records in one transaction"""
+        with self.db:
+            self.db.execute("DELETE FROM places WHERE location = ?", (city_name,))
+            self.db.executemany(UPSERT, (self.row_values(record, category)
+                                         for record, category in merge_categories(records)))
+
+    def near(self, lat, lon, radius_m, city=None, tag_key=None, tag_value=None, tags=None, limit=None):
+        """
+        Places within radius_m meters of a point, nearest first, as (distance_m, row) pairs
+
+        The R-tree narrows the search to the bounding box of the circle; city, the primary
+        tag and extra tags ({'religion': 'muslim'}, matched in all_tags) filter the candidates
+        """
+        lat_delta = radius_m / METERS_PER_DEGREE
+        lon_delta = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+
+        conditions = ["r.min_lat <= ?", "r.max_lat >= ?", "r.min_lon <= ?", "r.max_lon >= ?"]
+        params = [lat + lat_delta, lat - lat_delta, lon + lon_delta, lon - lon_delta]
+        if city:
+            conditions.append("p.location = ?")
+            params.append(city)
+        if tag_key:
+            conditions.append("p.osm_tag_key = ?")
+            params.append(tag_key)
+        if tag_value:
+            conditions.append("p.osm_tag_value = ?")
+            params.append(tag_value)
+        for key, value in (tags or {}).items():
+            conditions.append("json_extract(p.all_tags, ?) = ?")
+            params.extend([f'$."{key}"', value])
+
+        rows = self.db.execute("SELECT p.* FROM places_rtree r JOIN places p ON p.rowid = r.id WHERE "
+                               + " AND ".join(conditions), params)
+        found = []
+        for row in rows:
+            distance = haversine_m(lat, lon, row['latitude'], row['longitude'])
+            if distance <= radius_m:
+                found.append((distance, row))
+        found.sort(key=lambda item: item[0])
+        return found[:limit] if limit else found
+
+    def count(self, city=None):
+        if city:
+            return self.db.execute("SELECT COUNT(*) FROM places WHERE location = ?", (city,)).fetchone()[0]
+        return self.db.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+
+
+def parse_tag(text):
+    """'key=value' or 'key' from the command line as (key, value)"""
+    key, _, value = text.partition('=')
+    return key, value or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load collected OSM data into the SQLite place store and query it")
+    parser.add_argument("command", choices=["load", "near"])
+    parser.add_argument("--store", default=DEFAULT_STORE_FILE, help="SQLite file of the place store")
+    parser.add_argument("--data-dir", default=os.path.dirname(DEFAULT_STORE_FILE),
+                        help="load: directory with the legacy CSV files")
+    parser.add_argument("--lat", type=float, help="near: latitude of the center point")
+    parser.add_argument("--lon", type=float, help="near: longitude of the center point")
+    parser.add_argument("--radius", type=float, default=1000, help="near: search radius in meters")
+    parser.add_argument("--city", help="near: only places of this city")
+    parser.add_argument("--tag", type=parse_tag, help="near: primary tag as key=value or key")
+    parser.add_argument("--where", nargs="+", type=parse_tag, default=[],
+                        help="near: extra tags the places must have, as key=value")
+    parser.add_argument("--limit", type=int, default=20, help="near: maximum number of places shown")
+    args = parser.parse_args()
+
+    store = PlaceStore(args.store)
+    if args.command == "load":
+        # Imported here: osm_legacy depends on osm_collector, which writes into this store
+        from osm_legacy import legacy_files, load_legacy_csv
+        for slug, path in legacy_files(args.data_dir).items():
+            df = load_legacy_csv(path)
+            store.upsert(df.to_dict('records'))
+            print(f"🗄️ [{slug}] Loaded {len(df)} rows from {os.path.basename(path)}")
+        print(f"✅ {store.count()} places in {args.store}")
+    else:
+        if args.lat is None or args.lon is None:
+            parser.error("near needs --lat and --lon")
+        tag_key, tag_value = args.tag or (None, None)
+        places = store.near(args.lat, args.lon, args.radius, args.city, tag_key, tag_value,
+                            dict(args.where), args.limit)
+        for distance, row in places:
+            print(f"{distance:7.0f} m  {row['name'] or row['description']} ({row['osm_tag_key']}={row['osm_tag_value']})")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# Adaptive quadtree tiling for Overpass queries over large bounding boxes
+# A city bbox is cut into a grid of tiles that are fetched in parallel; tiles that
+# time out or exhaust the server's memory are split into quadrants and retried.
+# Request pacing is left to the API client (see overpass_scheduler.py).
+import math
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import overpy
+from overpass_scheduler import ScheduledOverpass, is_retryable
+
+# Tile edge length in degrees (~11 km) for the initial grid
+DEFAULT_TILE_SIZE = 0.1
+# Tiles are not split below this edge length (~1 km); failures at this size are reported
+MIN_TILE_SIZE = 0.01
+DEFAULT_TILE_WORKERS = 2
+
+ELEMENT_TYPES = ('node', 'way', 'relation')
+
+
+def iter_result_elements(result):
+    """Yield (element_type, element) pairs from an overpy Result or a streamed result"""
+    if not isinstance(result, overpy.Result):
+        yield from result
+        return
+    for element_type, elements in zip(ELEMENT_TYPES, (result.nodes, result.ways, result.relations)):
+        for element in elements:
+            yield element_type, element
+
+
+def describe_tile(tile):
+    """Short printable form of a tile bbox"""
+    return "(" + ", ".join(f"{v:.4f}" for v in tile) + ")"
+
+
+def split_bbox(bbox):
+    """Split a (south, west, north, east) bbox into its four quadrants"""
+    south, west, north, east = bbox
+    mid_lat = (south + north) / 2
+    mid_lon = (west + east) / 2
+    return [
+        (south, west, mid_lat, mid_lon),
+        (south, mid_lon, mid_lat, east),
+        (mid_lat, west, north, mid_lon),
+        (mid_lat, mid_lon, north, east),
+    ]
+
+
+def grid_tiles(bbox, tile_size=DEFAULT_TILE_SIZE):
+    """Cut a bbox into a regular grid of tiles no larger than tile_size degrees per side"""
+    south, west, north, east = bbox
+    rows = max(1, math.ceil((north - south) / tile_size))
+    cols = max(1, math.ceil((east - west) / tile_size))
+    lat_step = (north - south) / rows
+    lon_step = (east - west) / cols
+
+    tiles = []
+    for row in range(rows):
+        for col in range(cols):
+            tiles.append((
+                south + row * lat_step,
+                west + col * lon_step,
+                north if row == rows - 1 else south + (row + 1) * lat_step,
+                east if col == cols - 1 else west + (col + 1) * lon_step,
+            ))
+    return tiles
+
+
+def is_split_error(error):
+    """True if a failed tile query should be retried as four smaller tiles"""
+    if isinstance(error, overpy.exception.OverpassGatewayTimeout):
+        return True
+    if isinstance(error, overpy.exception.OverpassRuntimeError):
+        msg = (error.msg or '').lower()
+        return 'timed out' in msg or 'out of memory' in msg
+    return False
+
+
+def is_tile_retryable(error):
+    """Retry predicate for splittable tiles: transient failures, except those answered by a split"""
+    return is_retryable(error) and not is_split_error(error)
+
+
+def fetch_tiles(api, bbox, build_query, tile_size=DEFAULT_TILE_SIZE, min_tile_size=MIN_TILE_SIZE,
+                workers=DEFAULT_TILE_WORKERS, label=''):
+    """
+    Fetch an area tile by tile and merge the results
+
+    build_query(tile_bbox) returns the Overpass query for one tile. Tiles run on a pool
+    of workers, paced by the api's request scheduler; elements that cross tile edges
+    are kept once per (element_type, osm_id).
+    Returns (elements, failed_tiles) where elements is a list of (element_type, element)
+
+    With a scheduled api, timeouts and memory errors of tiles that can still be split are
+    not retried but split at once; rate limits and connection errors are retried as usual
+    """
+    seen = set()
+    elements = []
+    failed_tiles = []
+
+    def can_split(tile):
+        south, west, north, east = tile
+        return min(north - south, east - west) / 2 >= min_tile_size
+
+    def fetch(tile):
+        query = build_query(tile)
+        if isinstance(api, ScheduledOverpass):
+            result = api.query(query, is_tile_retryable if can_split(tile) else is_retryable)
+        else:
+            result = api.query(query)
+        # Untagged member nodes only carry geometry and are reached through their way.
+        # Streamed results are consumed here so that their errors fail this tile
+        return [(element_type, element) for element_type, element in iter_result_elements(result)
+                if element.tags]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(fetch, tile): tile for tile in grid_tiles(bbox, tile_size)}
+        print(f"🧩 [{label}] Fetching {len(pending)} tiles...")
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                tile = pending.pop(future)
+                try:
+                    tile_elements = future.result()
+                except Exception as e:
+                    if is_split_error(e) and can_split(tile):
+                        print(f"✂️ [{label}] Splitting tile {describe_tile(tile)} after: {str(e)}")
+                        for sub_tile in split_bbox(tile):
+                            pending[executor.submit(fetch, sub_tile)] = sub_tile
+                    else:
+                        print(f"❌ [{label}] Tile {describe_tile(tile)} failed: {str(e)}")
+                        failed_tiles.append(tile)
+                    continue
+
+                for element_type, element in tile_elements:
+                    key = (element_type, element.id)
+                    if key not in seen:
+                        seen.add(key)
+                        elements.append((element_type, element))
+
+    return elements, failed_tiles
@@ -0,0 +1,184 @@
+# Spatial validation of collected OSM points against city boundaries
+# Tests every point of every city in one vectorized STRtree query against the city
+# boundary polygons, and tags or drops the rows that fall outside their own city.
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.ops import polygonize, unary_union
+from osm_collector import DATA_DIR, CITY_TABLE, load_cities, make_api, format_bbox
+from overpass_cache import ResponseCache, DEFAULT_CACHE_DIR
+
+BOUNDARY_FILE = os.path.join(DATA_DIR, "city_boundaries.geojson")
+
+
+def boundary_query(city, timeout=120):
+    """Overpass query for the administrative boundaries named like the city inside its bbox"""
+    return "\n".join([
+        f"[out:json][timeout:{timeout}];",
+        f'relation["boundary"="administrative"]["name"~"^{city["name"]}",i]({format_bbox(city["bbox"])});',
+        "out geom;",
+    ])
+
+
+def relation_polygon(relation):
+    """Assemble the outer member ways of a boundary relation into a (multi)polygon"""
+    lines = [shapely.linestrings([(float(p.lon), float(p.lat)) for p in member.geometry])
+             for member in relation.members
+             if member.role == 'outer' and member.geometry and len(member.geometry) > 1]
+    polygons = list(polygonize(lines))
+    return unary_union(polygons) if polygons else None
+
+
+def pick_boundary(polygons, bbox):
+    """
+    The candidate polygon that best matches the city bbox: the one covering most of it,
+    and the smaller one when several cover it equally (a city rather than its district)
+    """
+    box = shapely.box(bbox[1], bbox[0], bbox[3], bbox[2])
+    return max(polygons, key=lambda p: (round(p.intersection(box).area / box.area, 2), -p.area))
+
+
+def fetch_boundaries(cities, cache=None):
+    """
+    Download the administrative boundary of each city from Overpass
+    Returns {city name: polygon}; cities without a matching boundary are left out
+    """
+    boundaries = {}
+    for city in cities:
+        api = make_api(cache, label=city['name'])
+        result = api.query(boundary_query(city))
+        polygons = [p for p in (relation_polygon(r) for r in result.relations) if p is not None and not p.is_empty]
+        if not polygons:
+            print(f"⚠️ [{city['name']}] No administrative boundary found, using the bounding box")
+            continue
+        boundaries[city['name']] = pick_boundary(polygons, city['bbox'])
+        print(f"🗺️ [{city['name']}] Boundary with {shapely.get_num_coordinates(boundaries[city['name']])} vertices")
+    return boundaries
+
+
+def save_boundaries(boundaries, path=BOUNDARY_FILE):
+    """Write {city name: polygon} as a GeoJSON FeatureCollection with a 'city' property"""
+    features = [{'type': 'Feature', 'properties': {'city': name}, 'geometry': json.loads(shapely.to_geojson(geometry))}
+                for name, geometry in boundaries.items()]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f)
+
+
+def read_boundary_file(path=BOUNDARY_FILE):
+    """{city name: polygon} of every boundary in a GeoJSON file, or {} without a file"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return {feature['properties']['city']: shapely.from_geojson(json.dumps(feature['geometry']))
+                for feature in json.load(f)['features']}
+
+
+def load_boundaries(cities, path=BOUNDARY_FILE):
+    """
+    {city name: polygon} for the given cities from a GeoJSON boundary file;
+    cities missing from the file (or all of them without a file) fall back to their bbox
+    """
+    boundaries = read_boundary_file(path)
+    result = {}
+    for city in cities:
+        if city['name'] in boundaries:
+            result[city['name']] = boundaries[city['name']]
+        else:
+            south, west, north, east = city['bbox']
+            result[city['name']] = shapely.box(west, south, east, north)
+    return result
+
+
+def validate_points(df, boundaries):
+    """
+    Check the latitude/longitude of every row against the boundary of its 'location' city
+
+    All points are tested in a single STRtree query (prepared geometries, no Python loop).
+    Returns a copy of df with 'in_boundary' (point inside its own city) and 'boundary_city'
+    (the city whose boundary actually contains the point, if any)
+    """
+    names = list(boundaries)
+    geometries = np.array([boundaries[name] for name in names], dtype=object)
+    shapely.prepare(geometries)
+    tree = shapely.STRtree(geometries)
+
+    lat = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype=float)
+    # Points without coordinates become empty geometries that match nothing
+    points = shapely.points(lon, lat)
+
+    point_idx, boundary_idx = tree.query(points, predicate='intersects')
+
+    city_codes = pd.Categorical(df['location'], categories=names).codes
+    in_boundary = np.zeros(len(df), dtype=bool)
+    in_boundary[point_idx[city_codes[point_idx] == boundary_idx]] = True
+
+    # First containing city per point, for rows collected under the wrong city
+    boundary_city = np.full(len(df), None, dtype=object)
+    first = np.unique(point_idx, return_index=True)[1]
+    boundary_city[point_idx[first]] = np.array(names, dtype=object)[boundary_idx[first]]
+
+    validated = df.copy()
+    validated['in_boundary'] = in_boundary
+    validated['boundary_city'] = boundary_city
+    return validated
+
+
+def clean_dataset(df, boundaries, drop=True):
+    """Validate all rows and drop (or only tag) the ones outside their city boundary"""
+    validated = validate_points(df, boundaries)
+    if drop:
+        validated = validated[validated['in_boundary']].drop(columns=['in_boundary', 'boundary_city'])
+    return validated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop or tag collected OSM points that fall outside their city boundary")
+    parser.add_argument("--cities", nargs="+", help="City names to validate (default: every city in the table)")
+    parser.add_argument("--city-table", default=CITY_TABLE, help="CSV file with the city definitions")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory with the <city>_osm_data.csv files")
+    parser.add_argument("--boundaries", default=BOUNDARY_FILE, help="GeoJSON file with one boundary per city")
+    parser.add_argument("--fetch-boundaries", action="store_true",
+                        help="Download the administrative boundaries from Overpass into the boundary file first")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory of the Overpass response cache")
+    parser.add_argument("--tag-only", action="store_true",
+                        help="Keep every row and add in_boundary/boundary_city columns instead of dropping rows "
+                             "(written to <city>_osm_validated.csv)")
+    args = parser.parse_args()
+
+    cities = load_cities(args.city_table, names=args.cities)
+    if args.fetch_boundaries:
+        fetched = fetch_boundaries(cities, ResponseCache(args.cache_dir))
+        save_boundaries({**read_boundary_file(args.boundaries), **fetched}, args.boundaries)
+    boundaries = load_boundaries(cities, args.boundaries)
+
+    frames = []
+    for city in cities:
+        path = os.path.join(args.data_dir, f"{city['slug']}_osm_data.csv")
+        if os.path.exists(path):
+            frames.append(pd.read_csv(path, encoding='utf-8'))
+    if not frames:
+        print(f"❌ No collected data found in {args.data_dir}")
+        return
+    df = pd.concat(frames, ignore_index=True)
+
+    cleaned = clean_dataset(df, boundaries, drop=not args.tag_only)
+    for city in cities:
+        city_rows = cleaned[cleaned['location'] == city['name']]
+        total = (df['location'] == city['name']).sum()
+        if not total:
+            continue
+        # Only output with the outside rows dropped is named _cleaned: osm_legacy.legacy_files
+        # prefers that file over the raw collection output
+        file_name = f"{city['slug']}_osm_validated.csv" if args.tag_only else f"osm_{city['slug']}_cleaned.csv"
+        output_file = os.path.join(args.data_dir, file_name)
+        city_rows.to_csv(output_file, index=False, encoding='utf-8')
+        outside = total - city_rows['in_boundary'].sum() if args.tag_only else total - len(city_rows)
+        print(f"🧹 [{city['name']}] {outside} of {total} rows outside the boundary -> {output_file}")
+
+
+if __name__ == "__main__":
+    main()
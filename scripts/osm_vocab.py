@@ -0,0 +1,133 @@
+# Persistent integer vocabulary for OSM tag keys, values and key=value pairs
+# Ids are assigned once and never change, and the vocabulary is a small SQLite file shared
+# by every process (collectors, job workers, cleaning and mining), so tags can be stored
+# and processed as int arrays that mean the same thing everywhere.
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+DEFAULT_VOCAB_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "osm_tag_vocab.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tag_keys (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS tag_values (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS tag_pairs (
+    id INTEGER PRIMARY KEY,
+    key_id INTEGER NOT NULL REFERENCES tag_keys(id),
+    value_id INTEGER NOT NULL REFERENCES tag_values(id),
+    UNIQUE (key_id, value_id)
+);
+"""
+
+# Table and text column of each id space
+_SPACES = {'key': ('tag_keys', 'key'), 'value': ('tag_values', 'value')}
+
+
+class TagVocabulary:
+    """
+    Stable ids for tag keys, tag values and key=value pairs
+
+    Lookups are served from memory; unknown strings are inserted into the SQLite file
+    (INSERT OR IGNORE, then read back), so concurrent processes always agree on an id.
+    Ids start at 1; 0 is never assigned and can mark a missing tag
+    """
+
+    def __init__(self, path=DEFAULT_VOCAB_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._ids = {'key': {}, 'value': {}}
+        self._pairs = {}
+        self.reload()
+
+    def close(self):
+        self.db.close()
+
+    def reload(self):
+        """Load every id assigned so far, including those added by other processes"""
+        with self._lock:
+            for space, (table, column) in _SPACES.items():
+                self._ids[space] = dict(self.db.execute(f"SELECT {column}, id FROM {table}"))
+            self._pairs = {(key_id, value_id): pair_id for pair_id, key_id, value_id
+                           in self.db.execute("SELECT id, key_id, value_id FROM tag_pairs")}
+
+    def _lookup(self, space, texts):
+        """Ids of several strings of one space, assigning ids to the unknown ones"""
+        ids = self._ids[space]
+        missing = [text for text in dict.fromkeys(texts) if text not in ids]
+        if missing:
+            table, column = _SPACES[space]
+            with self._lock, self.db:
+                self.db.executemany(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", [(t,) for t in missing])
+                for text in missing:
+                    ids[text] = self.db.execute(f"SELECT id FROM {table} WHERE {column} = ?", (text,)).fetchone()[0]
+        return [ids[text] for text in texts]
+
+    def key_id(self, key):
+        return self._lookup('key', [key])[0]
+
+    def value_id(self, value):
+        return self._lookup('value', [value])[0]
+
+    def pair_ids(self, pairs):
+        """Ids of several (key, value) pairs, assigning ids to the unknown ones"""
+        pairs = list(pairs)
+        key_ids = self._lookup('key', [k for k, _ in pairs])
+        value_ids = self._lookup('value', [v for _, v in pairs])
+        id_pairs = list(zip(key_ids, value_ids))
+        missing = [pair for pair in dict.fromkeys(id_pairs) if pair not in self._pairs]
+        if missing:
+            with self._lock, self.db:
+                self.db.executemany("INSERT OR IGNORE INTO tag_pairs (key_id, value_id) VALUES (?, ?)", missing)
+                for key_id, value_id in missing:
+                    self._pairs[key_id, value_id] = self.db.execute(
+                        "SELECT id FROM tag_pairs WHERE key_id = ? AND value_id = ?", (key_id, value_id)).fetchone()[0]
+        return [self._pairs[pair] for pair in id_pairs]
+
+    def pair_id(self, key, value):
+        return self.pair_ids([(key, value)])[0]
+
+    def encode_tags(self, tags):
+        """int32 array of the pair ids of a tag dict, sorted"""
+        return np.sort(np.array(self.pair_ids(tags.items()), dtype=np.int32))
+
+    def encode_column(self, series, space='value'):
+        """
+        Encode a column of keys or values (e.g. osm_tag_key/osm_tag_value) as an int32 array
+        Each distinct string is looked up once; missing values become 0
+        """
+        codes, uniques = pd.factorize(series)
+        ids = np.array([0] + self._lookup(space, list(uniques)), dtype=np.int32)
+        return ids[codes + 1]
+
+    def tag_matrix(self, tag_dicts):
+        """
+        Sparse element x tag-pair incidence matrix of a sequence of tag dicts in CSR form:
+        (indptr, indices), where the pair ids of element i are indices[indptr[i]:indptr[i + 1]];
+        the transactions for pattern mining and the feature rows for training
+        """
+        tag_dicts = [tags if isinstance(tags, dict) else {} for tags in tag_dicts]
+        lengths = np.array([len(tags) for tags in tag_dicts], dtype=np.int64)
+        indptr = np.zeros(len(tag_dicts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+
+        # All pairs are looked up in one batch, then sorted within each row
+        indices = np.array(self.pair_ids(item for tags in tag_dicts for item in tags.items()), dtype=np.int32)
+        rows = np.repeat(np.arange(len(tag_dicts)), lengths)
+        return indptr, indices[np.lexsort((indices, rows))]
+
+    def decode_pairs(self, pair_ids):
+        """(key, value) strings of pair ids"""
+        known = set(self._pairs.values())
+        if any(int(i) not in known for i in pair_ids):
+            # Assigned by another process since this vocabulary was loaded
+            self.reload()
+        keys = {i: text for text, i in self._ids['key'].items()}
+        values = {i: text for text, i in self._ids['value'].items()}
+        pairs = {i: pair for pair, i in self._pairs.items()}
+        return [(keys[pairs[int(i)][0]], values[pairs[int(i)][1]]) for i in pair_ids]
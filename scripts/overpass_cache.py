@@ -0,0 +1,189 @@
+# Persistent on-disk cache for Overpass API responses
+# Responses are stored gzip-compressed under the SHA-256 of the normalized query text,
+# expire after a TTL, are evicted oldest-first above a size limit, and can be replayed
+# without any network access in offline mode.
+import os
+import gzip
+import hashlib
+import threading
+import time
+import overpy
+
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "overpass"))
+DEFAULT_TTL_HOURS = 24
+DEFAULT_MAX_MB = 1024
+
+
+class OfflineCacheMiss(overpy.exception.OverPyException):
+    """Raised in offline mode when a query has no cached response"""
+
+    def __init__(self, query):
+        super().__init__(f"No cached response for query (offline mode): {normalize_query(query)[:120]}")
+        self.query = query
+
+
+def normalize_query(query):
+    """Collapse whitespace so formatting differences map to the same cache entry"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8')
+    return " ".join(query.split())
+
+
+class ResponseCache:
+    """
+    Content-addressed store of raw Overpass responses
+
+    ttl_hours=None keeps entries forever; max_mb=None disables size-based eviction.
+    In offline mode expired entries are still replayed and misses raise OfflineCacheMiss.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_hours=DEFAULT_TTL_HOURS, max_mb=DEFAULT_MAX_MB, offline=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl_hours * 3600 if ttl_hours is not None else None
+        self.max_bytes = max_mb * 1024 * 1024 if max_mb is not None else None
+        self.offline = offline
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, query):
+        return hashlib.sha256(normalize_query(query).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+    def is_fresh(self, path):
+        if not os.path.exists(path):
+            return False
+        if self.offline or self.ttl is None:
+            return True
+        return time.time() - os.path.getmtime(path) < self.ttl
+
+    def contains(self, query):
+        """True if the query would be answered from the cache"""
+        return self.is_fresh(self.path(self.key(query)))
+
+    def get(self, query):
+        """Return the cached raw response bytes, or None if missing or expired"""
+        f = self.open(query)
+        if f is None:
+            return None
+        try:
+            with f:
+                return f.read()
+        except (OSError, EOFError):
+            # Corrupted entry; treat as a miss
+            return None
+
+    def open(self, query):
+        """Open a fresh cache entry as a readable binary stream, or return None if missing or expired"""
+        path = self.path(self.key(query))
+        if not self.is_fresh(path):
+            if self.offline:
+                raise OfflineCacheMiss(query)
+            return None
+        return gzip.open(path, 'rb')
+
+    def writer(self, query):
+        """Start writing the response of a query; see CacheEntryWriter"""
+        return CacheEntryWriter(self, self.path(self.key(query)))
+
+    def put(self, query, response):
+        """Store raw response bytes for a query"""
+        writer = self.writer(query)
+        writer.write(response)
+        writer.commit()
+
+    def entries(self):
+        """List (mtime, size, path) for every cache entry"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for file_name in files:
+                if file_name.endswith('.json.gz'):
+                    path = os.path.join(root, file_name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove the oldest entries until the cache fits into max_bytes"""
+        with self._lock:
+            entries = sorted(self.entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+class CacheEntryWriter:
+    """
+    Incremental writer for one cache entry: chunks go to a temporary file that only
+    replaces the entry on commit(), so readers never see partial responses
+    """
+
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+        self.tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = gzip.open(self.tmp_path, 'wb', compresslevel=6)
+
+    def write(self, data):
+        self._file.write(data)
+
+    def commit(self):
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        if self.cache.max_bytes is not None:
+            self.cache.evict()
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class CachedOverpass(overpy.Overpass):
+    """
+    overpy.Overpass that answers queries from a ResponseCache and stores successful responses
+
+    Results served from the cache have result.from_cache set to True
+    """
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self._local = threading.local()
+
+    def is_cached(self, query):
+        return self.cache.contains(query)
+
+    def query(self, query):
+        raw = self.cache.get(query)
+        if raw is not None:
+            result = super().parse_json(raw)
+            result.from_cache = True
+            return result
+
+        # parse_json stores the raw body once the response has been parsed successfully
+        self._local.query = query
+        try:
+            result = super().query(query)
+        finally:
+            self._local.query = None
+        result.from_cache = False
+        return result
+
+    def parse_json(self, data, encoding='utf-8'):
+        # Runtime errors reported by the server raise here and are never cached
+        result = super().parse_json(data, encoding)
+        query = getattr(self._local, 'query', None)
+        if query is not None:
+            self.cache.put(query, data if isinstance(data, bytes) else data.encode(encoding))
+        return result
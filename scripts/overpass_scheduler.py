@@ -0,0 +1,195 @@
+# Adaptive request scheduler for the Overpass API
+# Dispatches queries as soon as the server reports a free slot for our IP (/api/status),
+# and retries rate-limited, overloaded or dropped requests with exponential backoff and jitter.
+import re
+import random
+import socket
+import threading
+import time
+from http.client import HTTPException
+from urllib.error import URLError
+from urllib.request import urlopen
+import overpy
+from overpass_stream import TruncatedResponse
+
+DEFAULT_MAX_RETRIES = 5
+# Backoff before retry n is drawn from [0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** n)] seconds
+BASE_BACKOFF = 2.0
+MAX_BACKOFF = 120.0
+# Re-check the status this often while no slot is free, and at most this long in one wait
+STATUS_POLL_INTERVAL = 1.0
+MAX_SLOT_WAIT = 60.0
+STATUS_TIMEOUT = 10
+
+_RATE_LIMIT = re.compile(r'Rate limit:\s*(\d+)')
+_SLOTS_NOW = re.compile(r'(\d+)\s+slots? available now')
+_SLOT_AFTER = re.compile(r'Slot available after:.*?in\s+(-?\d+)\s+seconds')
+
+
+def status_url_for(interpreter_url):
+    """Status endpoint of an Overpass server, e.g. .../api/interpreter -> .../api/status"""
+    return re.sub(r'/interpreter/?$', '/status', interpreter_url)
+
+
+def parse_status(text):
+    """
+    Parse the text of /api/status into (rate_limit, free_slots, seconds_until_next_slot)
+    rate_limit 0 means unlimited; seconds_until_next_slot is None when a slot is free
+    """
+    match = _RATE_LIMIT.search(text)
+    rate_limit = int(match.group(1)) if match else 0
+
+    match = _SLOTS_NOW.search(text)
+    free_slots = int(match.group(1)) if match else 0
+
+    waits = [max(0, int(w)) for w in _SLOT_AFTER.findall(text)]
+    if rate_limit == 0 or free_slots > 0 or not waits:
+        # An unreadable status is treated as a free slot; backoff takes over on 429
+        return rate_limit, max(free_slots, 1), None
+    return rate_limit, 0, min(waits)
+
+
+def is_retryable(error):
+    """True for transient failures worth retrying: rate limits, overload and network errors"""
+    if isinstance(error, (overpy.exception.OverpassTooManyRequests, overpy.exception.OverpassGatewayTimeout)):
+        return True
+    if isinstance(error, overpy.exception.OverpassUnknownHTTPStatusCode):
+        return error.code >= 500
+    return isinstance(error, (URLError, HTTPException, ConnectionError, socket.timeout, TimeoutError, TruncatedResponse))
+
+
+class RequestScheduler:
+    """
+    Shared, thread-safe dispatcher for Overpass requests
+
+    acquire() blocks until the server reports a free slot (and our own in-flight
+    requests stay below its rate limit); run() wraps a call with retries.
+    min_interval optionally enforces a fixed gap between request starts on top of that.
+    """
+
+    def __init__(self, url=overpy.Overpass.default_url, max_retries=DEFAULT_MAX_RETRIES,
+                 base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF, min_interval=0.0):
+        self.status_url = status_url_for(url)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.min_interval = min_interval
+        self._condition = threading.Condition()
+        self._dispatch_lock = threading.Lock()
+        self._in_flight = 0
+        self._rate_limit = 0
+        self._last_start = 0.0
+
+    def fetch_status(self):
+        """Return (rate_limit, free_slots, seconds_until_next_slot) from the server"""
+        try:
+            with urlopen(self.status_url, timeout=STATUS_TIMEOUT) as response:
+                return parse_status(response.read().decode('utf-8', errors='replace'))
+        except Exception:
+            # Servers without a status endpoint are only governed by backoff
+            return 0, 1, None
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        # One thread at a time decides on dispatch, so a single free slot is not handed out twice
+        with self._dispatch_lock:
+            while True:
+                with self._condition:
+                    while self._rate_limit and self._in_flight >= self._rate_limit:
+                        self._condition.wait()
+
+                gap = self._last_start + self.min_interval - time.monotonic()
+                if gap > 0:
+                    time.sleep(gap)
+
+                rate_limit, free_slots, wait = self.fetch_status()
+                self._rate_limit = rate_limit
+                if wait is None:
+                    break
+                # Sleep until the next slot frees up, with jitter so workers do not wake together
+                time.sleep(min(max(wait, STATUS_POLL_INTERVAL), MAX_SLOT_WAIT) + random.uniform(0, 1))
+
+            with self._condition:
+                self._in_flight += 1
+            self._last_start = time.monotonic()
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff delay for a retry attempt (0-based)"""
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def run(self, call, label='', retryable=is_retryable):
+        """
+        Run call() once a slot is free, retrying failures for which retryable(error) is true
+        (by default the transient ones) up to max_retries times
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            try:
+                return call()
+            except Exception as e:
+                if not retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                print(f"⏳ {label}Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s after: {str(e)}")
+            finally:
+                self.release()
+            time.sleep(delay)
+
+    def run_stream(self, open_stream, label='', retryable=is_retryable):
+        """
+        Like run() for a lazily read response: yields the (element_type, element) pairs of
+        open_stream(), holding the slot until the stream is exhausted, and retries failures
+        that happen while the body is read. Overpass returns elements in a fixed order, so a
+        retried response skips the elements that were already yielded
+        """
+        yielded = 0
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            try:
+                for index, item in enumerate(open_stream()):
+                    if index >= yielded:
+                        yielded += 1
+                        yield item
+                return
+            except Exception as e:
+                if not retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                print(f"⏳ {label}Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s after: {str(e)}")
+            finally:
+                self.release()
+            time.sleep(delay)
+
+
+class ScheduledOverpass:
+    """
+    Wraps an Overpass client so that every network query goes through a RequestScheduler;
+    queries answered from the client's response cache (or an offline cache, which never
+    goes to the network) skip the scheduler
+    """
+
+    def __init__(self, api, scheduler, label=''):
+        self.api = api
+        self.scheduler = scheduler
+        self.label = f"[{label}] " if label else ''
+
+    def is_cached(self, query):
+        is_cached = getattr(self.api, 'is_cached', None)
+        return bool(is_cached and is_cached(query))
+
+    def is_offline(self):
+        cache = getattr(self.api, 'cache', None)
+        return bool(cache is not None and cache.offline)
+
+    def query(self, query, retryable=is_retryable):
+        """Result of a query; retryable(error) decides which network failures are retried"""
+        if self.is_cached(query) or self.is_offline():
+            return self.api.query(query)
+        if getattr(self.api, 'streaming', False):
+            return self.scheduler.run_stream(lambda: self.api.query(query), self.label, retryable)
+        return self.scheduler.run(lambda: self.api.query(query), self.label, retryable)
@@ -0,0 +1,233 @@
+# Streaming Overpass JSON client
+# Reads the HTTP body in chunks and yields one lightweight element record at a time,
+# instead of building a full overpy Result with Decimal coordinates in memory.
+import re
+import json
+import codecs
+from collections import namedtuple
+from urllib.request import urlopen
+from urllib.error import HTTPError
+import overpy
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_ELEMENTS_START = re.compile(r'"elements"\s*:\s*\[')
+_REMARK = re.compile(r'"remark"\s*:\s*("(?:[^"\\]|\\.)*")')
+_decoder = json.JSONDecoder()
+
+GeometryPoint = namedtuple('GeometryPoint', ['lat', 'lon'])
+
+
+class TruncatedResponse(ValueError):
+    """Raised when the connection ends before the elements array is closed"""
+
+
+class StreamMember:
+    """Relation member of a streamed element; geometry is set with 'out geom'"""
+    __slots__ = ('ref', 'role', 'geometry', 'attributes')
+
+    def __init__(self, data):
+        self.ref = data.get('ref')
+        self.role = data.get('role')
+        geometry = data.get('geometry')
+        self.geometry = [GeometryPoint(p['lat'], p['lon']) for p in geometry if p] if geometry else None
+        self.attributes = {k: data[k] for k in ('lat', 'lon') if k in data}
+
+
+class StreamElement:
+    """
+    Lightweight stand-in for overpy Node/Way/Relation with the attributes that
+    process_osm_element reads; attributes holds meta fields and inline geometry
+    """
+    __slots__ = ('id', 'tags', 'lat', 'lon', 'center_lat', 'center_lon', 'attributes', 'members', 'nodes')
+
+    def __init__(self, data):
+        self.id = data.get('id')
+        self.tags = data.get('tags', {})
+        self.lat = data.get('lat')
+        self.lon = data.get('lon')
+        center = data.get('center') or {}
+        self.center_lat = center.get('lat')
+        self.center_lon = center.get('lon')
+        self.attributes = {k: v for k, v in data.items()
+                           if k in ('version', 'timestamp', 'changeset', 'user', 'uid', 'geometry', 'bounds')}
+        self.members = [StreamMember(m) for m in data.get('members', ())]
+        # Member nodes are never resolved while streaming
+        self.nodes = ()
+
+
+def iter_overpass_json(stream, chunk_size=READ_CHUNK_SIZE, encoding='utf-8'):
+    """
+    Incrementally parse an Overpass JSON response from a binary stream
+
+    Yields (element_type, StreamElement) pairs as soon as each element is complete,
+    so memory stays bounded by the largest single element. A 'remark' carrying a
+    runtime error raises the matching overpy exception once the stream is exhausted.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            buffer = buffer[pos:] + decoder.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + decoder.decode(chunk)
+        pos = 0
+
+    # Skip the header (version, generator, osm3s) up to the elements array
+    while True:
+        match = _ELEMENTS_START.search(buffer, pos)
+        if match:
+            pos = match.end()
+            break
+        if eof:
+            # No elements array, e.g. an error document with only a remark
+            _raise_remark(buffer)
+            return
+        fill()
+
+    # Decode one element object at a time
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise TruncatedResponse("Truncated Overpass response: elements array is not closed")
+            fill()
+            continue
+        if buffer[pos] == ']':
+            pos += 1
+            break
+        try:
+            data, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise TruncatedResponse("Truncated Overpass response: element is not complete") from e
+            # Element continues in the next chunk
+            fill()
+            continue
+        pos = end
+        element_type = data.get('type')
+        if element_type in ('node', 'way', 'relation'):
+            yield element_type, StreamElement(data)
+
+    # The trailer is small: it holds at most the remark
+    trailer = buffer[pos:]
+    while not eof:
+        buffer, pos = '', 0
+        fill()
+        trailer += buffer
+    _raise_remark(trailer)
+
+
+def _raise_remark(text):
+    match = _REMARK.search(text)
+    if match:
+        overpy.Overpass._handle_remark_msg(json.loads(match.group(1)))
+
+
+class StreamResult:
+    """
+    Lazily parsed query result; iterating yields (element_type, StreamElement) pairs
+    and can only be done once. on_complete runs after the whole response was parsed
+    """
+
+    def __init__(self, stream, from_cache=False, on_complete=None, on_error=None):
+        self.stream = stream
+        self.from_cache = from_cache
+        self.on_complete = on_complete
+        self.on_error = on_error
+
+    def __iter__(self):
+        try:
+            yield from iter_overpass_json(self.stream)
+        except BaseException:
+            if self.on_error:
+                self.on_error()
+            raise
+        finally:
+            self.stream.close()
+        if self.on_complete:
+            self.on_complete()
+
+
+class TeeReader:
+    """Binary stream wrapper that copies every chunk it reads to a writer"""
+
+    def __init__(self, stream, writer):
+        self.stream = stream
+        self.writer = writer
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        if data:
+            self.writer.write(data)
+        return data
+
+    def close(self):
+        self.stream.close()
+
+
+class StreamingOverpass(overpy.Overpass):
+    """
+    Overpass client whose query() returns a StreamResult instead of an overpy Result
+
+    Only usable with 'out center' or 'out geom' queries: with '>; out skel' the way
+    nodes arrive after their ways and could not be resolved without buffering.
+    With a ResponseCache, hits are streamed from disk and misses are written to the
+    cache while they are parsed, and only kept if the whole response was valid.
+    """
+
+    # Results are read lazily: see RequestScheduler.run_stream
+    streaming = True
+
+    def __init__(self, cache=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def is_cached(self, query):
+        return self.cache is not None and self.cache.contains(query)
+
+    def query(self, query):
+        if self.cache is not None:
+            cached = self.cache.open(query)
+            if cached is not None:
+                return StreamResult(cached, from_cache=True)
+
+        response = self.open_response(query)
+        if self.cache is None:
+            return StreamResult(response)
+
+        writer = self.cache.writer(query)
+        return StreamResult(TeeReader(response, writer), on_complete=writer.commit, on_error=writer.abort)
+
+    def open_response(self, query):
+        """POST the query and return the open HTTP response, raising overpy exceptions on errors"""
+        if not isinstance(query, bytes):
+            query = query.encode('utf-8')
+
+        try:
+            response = urlopen(self.url, query)
+        except HTTPError as e:
+            response = e
+
+        if response.code == 200:
+            content_type = response.getheader('Content-Type')
+            if content_type != 'application/json':
+                response.close()
+                raise overpy.exception.OverpassUnknownContentType(content_type)
+            return response
+
+        response.close()
+        if response.code == 400:
+            raise overpy.exception.OverpassBadRequest(query)
+        if response.code == 429:
+            raise overpy.exception.OverpassTooManyRequests()
+        if response.code == 504:
+            raise overpy.exception.OverpassGatewayTimeout()
+        raise overpy.exception.OverpassUnknownHTTPStatusCode(response.code)
@@ -0,0 +1,211 @@
+# Concurrent web page fetching for the phrase extraction scripts
+# Downloads many pages on a thread pool through one pooled requests.Session, limits the
+# concurrency and request rate per host, and keeps an on-disk cache that is revalidated
+# with ETag/Last-Modified, so reruns only transfer pages that changed. In offline mode
+# pages are replayed from the cache without any network access.
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "pages"))
+# Cached pages younger than this are served without contacting the server
+DEFAULT_TTL_HOURS = 24
+DEFAULT_WORKERS = 8
+# Politeness per host: concurrent requests, and seconds between request starts
+DEFAULT_PER_HOST = 2
+DEFAULT_HOST_INTERVAL = 1.0
+DEFAULT_TIMEOUT = 10
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class OfflinePageMiss(Exception):
+    """Raised in offline mode when a URL has no cached page"""
+
+    def __init__(self, url):
+        super().__init__(f"No cached page for {url} (offline mode)")
+        self.url = url
+
+
+class Page:
+    """A fetched page: raw body bytes plus the encoding to decode them with"""
+    __slots__ = ('url', 'content', 'encoding', 'from_cache')
+
+    def __init__(self, url, content, encoding, from_cache=False):
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+class PageCache:
+    """
+    On-disk page store keyed by the SHA-256 of the URL: the gzip-compressed body and a JSON
+    sidecar with the validators (ETag, Last-Modified) and encoding of the response
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_hours=DEFAULT_TTL_HOURS):
+        self.cache_dir = cache_dir
+        self.ttl = ttl_hours * 3600 if ttl_hours is not None else None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.html.gz", f"{base}.json"
+
+    def load(self, url):
+        """(metadata, Page) of a cached URL, or (None, None)"""
+        body_path, meta_path = self.paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with gzip.open(body_path, 'rb') as f:
+                content = f.read()
+        except (OSError, EOFError, ValueError):
+            # Missing or corrupted entry; treat as a miss
+            return None, None
+        return meta, Page(url, content, meta.get('encoding'), from_cache=True)
+
+    def is_fresh(self, meta):
+        return self.ttl is None or time.time() - meta.get('checked_at', 0) < self.ttl
+
+    def store(self, url, response):
+        """Store a 200 response with its validators"""
+        body_path, meta_path = self.paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        tmp = f".{threading.get_ident()}.tmp"
+        with gzip.open(body_path + tmp, 'wb', compresslevel=6) as f:
+            f.write(response.content)
+        os.replace(body_path + tmp, body_path)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'encoding': response.encoding or response.apparent_encoding,
+            'checked_at': time.time(),
+        }
+        self._write_meta(meta_path, meta)
+        return Page(url, response.content, meta['encoding'])
+
+    def touch(self, url, meta):
+        """Record that a cached page was revalidated (304 Not Modified)"""
+        meta['checked_at'] = time.time()
+        self._write_meta(self.paths(url)[1], meta)
+
+    def _write_meta(self, path, meta):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+
+class HostLimiter:
+    """Per-host semaphore plus a minimum interval between request starts to the same host"""
+
+    def __init__(self, per_host=DEFAULT_PER_HOST, interval=DEFAULT_HOST_INTERVAL):
+        self.per_host = per_host
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next_start = {}
+
+    def acquire(self, host):
+        with self._lock:
+            slots = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        slots.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, host):
+        self._slots[host].release()
+
+
+class PageFetcher:
+    """
+    Fetch pages concurrently through one pooled session, politely per host
+
+    With a cache, fresh pages are served from disk and stale ones are revalidated with
+    If-None-Match/If-Modified-Since; offline=True serves only from the cache and raises
+    OfflinePageMiss for anything else
+    """
+
+    def __init__(self, cache=None, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                 host_interval=DEFAULT_HOST_INTERVAL, timeout=DEFAULT_TIMEOUT, offline=False):
+        self.cache = cache
+        self.workers = workers
+        self.timeout = timeout
+        self.offline = offline
+        self.limiter = HostLimiter(per_host, host_interval)
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        retries = Retry(total=3, backoff_factor=1.0, status_forcelist=(429, 500, 502, 503, 504),
+                        respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def fetch(self, url):
+        """Page of a URL, from the cache where possible"""
+        meta, cached = self.cache.load(url) if self.cache is not None else (None, None)
+        if cached is not None and (self.offline or self.cache.is_fresh(meta)):
+            return cached
+        if self.offline:
+            raise OfflinePageMiss(url)
+
+        headers = {}
+        if cached is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        host = urlsplit(url).netloc
+        self.limiter.acquire(host)
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        finally:
+            self.limiter.release(host)
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(url, meta)
+            return cached
+        response.raise_for_status()
+        if self.cache is not None:
+            return self.cache.store(url, response)
+        return Page(url, response.content, response.encoding or response.apparent_encoding)
+
+    def fetch_all(self, urls):
+        """
+        Yield (url, Page or None) for each URL in input order, fetched on the thread pool;
+        failures are reported and yield None
+        """
+        def fetch_one(url):
+            try:
+                return self.fetch(url)
+            except Exception as e:
+                print(f"✗ Error fetching {url}: {str(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            yield from zip(urls, executor.map(fetch_one, urls))
@@ -0,0 +1,72 @@
+# Local page sources for the phrase extraction scripts
+# Streams HTML pages from a directory tree or from WARC archives (e.g. a crawl) one at a time,
+# as the same Page objects the fetcher returns, so a corpus of any size is never held in memory.
+import os
+import re
+import gzip
+from page_fetch import Page
+
+try:
+    from warcio.archiveiterator import ArchiveIterator
+except ImportError:
+    ArchiveIterator = None
+
+HTML_EXTENSIONS = ('.html', '.htm', '.html.gz', '.htm.gz')
+WARC_EXTENSIONS = ('.warc', '.warc.gz')
+
+_CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def require_warcio():
+    if ArchiveIterator is None:
+        raise ImportError("WARC input needs warcio: pip install warcio")
+
+
+def iter_directory_pages(directory):
+    """
+    Yield a Page for every HTML file under directory, in sorted path order
+    The page url is the file path relative to directory; the encoding is left to the parser
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file_name in sorted(files):
+            if not file_name.lower().endswith(HTML_EXTENSIONS):
+                continue
+            path = os.path.join(root, file_name)
+            opener = gzip.open if file_name.lower().endswith('.gz') else open
+            with opener(path, 'rb') as f:
+                content = f.read()
+            yield Page(os.path.relpath(path, directory), content, None, from_cache=True)
+
+
+def iter_warc_pages(path):
+    """Yield a Page for every HTML response record of a WARC file (plain or gzipped)"""
+    require_warcio()
+    with open(path, 'rb') as f:
+        for record in ArchiveIterator(f):
+            if record.rec_type != 'response' or record.http_headers is None:
+                continue
+            content_type = record.http_headers.get_header('Content-Type') or ''
+            if 'html' not in content_type.lower():
+                continue
+            match = _CHARSET.search(content_type)
+            yield Page(record.rec_headers.get_header('WARC-Target-URI'), record.content_stream().read(),
+                       match.group(1) if match else None, from_cache=True)
+
+
+def iter_pages(source):
+    """
+    Yield the pages of a local source: a directory of HTML files (and WARC files),
+    or a single WARC file
+    """
+    if os.path.isdir(source):
+        yield from iter_directory_pages(source)
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for file_name in sorted(files):
+                if file_name.lower().endswith(WARC_EXTENSIONS):
+                    yield from iter_warc_pages(os.path.join(root, file_name))
+    elif source.lower().endswith(WARC_EXTENSIONS):
+        yield from iter_warc_pages(source)
+    else:
+        raise ValueError(f"Not a directory or WARC file: {source}")